@@ -0,0 +1,62 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+# Benchmark of the string encoding and decoding on mixed-language patient names
+# python benchmarks/bench_unicode.py
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from iris_dollar_list import DollarList, DollarListWriter # pylint: disable=wrong-import-position
+
+NAMES = [
+    'Smith', 'Johnson', 'Müller', 'François', 'Zoë Ångström', 'José Núñez',
+    'Łukasz Wróbel', 'Dvořák', 'Иванов', 'Παπαδόπουλος', '김민준', '田中太郎',
+    '王伟', 'محمد', 'כהן', 'Nguyễn Văn An', 'Øyvind', "O'Brien",
+] * 1000
+
+def legacy_create_from_string(writer, item):
+    # the try/except chain used before the single-pass classifier
+    try:
+        return writer.create_from_ascii(item, 'ascii')
+    except UnicodeEncodeError:
+        try:
+            return writer.create_from_ascii(item, 'latin-1')
+        except UnicodeEncodeError:
+            return writer.create_from_ascii(item, 'utf-16')
+
+def legacy_encode(item):
+    try:
+        return item.encode('ascii')
+    except UnicodeEncodeError:
+        try:
+            return item.encode('latin-1')
+        except UnicodeEncodeError:
+            return item.encode('utf-16')
+
+def encode(item):
+    if item.isascii():
+        return item.encode('ascii')
+    if max(item) <= '\xff':
+        return item.encode('latin-1')
+    return item.encode('utf-16-le')
+
+def main():
+    writer = DollarListWriter()
+    encoded = DollarList.from_list(NAMES).to_bytes()
+    benchmarks = {
+        'raw legacy': lambda: [legacy_encode(name) for name in NAMES],
+        'raw': lambda: [encode(name) for name in NAMES],
+        'encode legacy': lambda: [legacy_create_from_string(writer, name) for name in NAMES],
+        'encode': lambda: [writer.create_from_string(name) for name in NAMES],
+        'decode': lambda: DollarList.from_bytes(encoded),
+    }
+    for name, function in benchmarks.items():
+        elapsed = min(timeit.repeat(function, number=5, repeat=3)) / 5
+        print(f'{name:<16}{len(NAMES) / elapsed:>14,.0f} names/s')
+
+if __name__ == '__main__':
+    main()
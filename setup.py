@@ -40,7 +40,7 @@ def main():
         packages=['iris_dollar_list'],
         entry_points={
             'console_scripts': [
-                'iris-dollar-list = dollar_list.main:main'
+                'iris-dollar-list = iris_dollar_list.cli:main'
             ]
         }
     )
@@ -1,4 +1,52 @@
 # Licensed under the MIT License
 # https://github.com/grongierisc/dollar-list/blob/main/LICENSE
 
-from .dollar_list import *
+# not a star import, it would load Dollartype
+from .dollar_list import (DollarItem, DollarItems, DollarList, DollarListException,
+                          DollarListReader, DollarListWriter, SCALAR_DECODERS,
+                          decode_items, disable_stats, dumps, enable_stats, get_stats,
+                          loads, read_item_header, register_decoder, register_encoder,
+                          unregister_encoder)
+
+# the other features are imported on first use,
+# importing the package only loads what loads() and dumps() need
+_LAZY_ATTRIBUTES = {
+    'Dollartype': 'dollartype',
+    'merge_lists': 'collation',
+    'sort_key': 'collation',
+    'sort_lists': 'collation',
+    'diff_lists': 'delta',
+    'patch_list': 'delta',
+    'date_to_horolog': 'horolog',
+    'datetime_to_horolog': 'horolog',
+    'horolog_to_date': 'horolog',
+    'horolog_to_datetime': 'horolog',
+    'register_horolog': 'horolog',
+    'DollarSchema': 'schema',
+    'DollarTable': 'table',
+    'decode_table': 'table',
+    'DollarListLimits': 'limits',
+    'DollarListUsage': 'limits',
+    'DollarListValidation': 'validator',
+    'validate': 'validator',
+}
+
+__all__ = [
+    'DollarItem', 'DollarItems', 'DollarList', 'DollarListException',
+    'DollarListReader', 'DollarListWriter', 'SCALAR_DECODERS', 'decode_items',
+    'disable_stats', 'dumps', 'enable_stats', 'get_stats', 'loads',
+    'read_item_header', 'register_decoder', 'register_encoder', 'unregister_encoder',
+    *_LAZY_ATTRIBUTES,
+]
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # like "from .module import name"
+    value = getattr(__import__(module, globals(), None, (name,), 1), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
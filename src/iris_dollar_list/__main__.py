@@ -0,0 +1,8 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,238 @@
+# Module that covers the command line tool
+# python -m iris_dollar_list converts files of records between
+# binary $list, $lb(...) text and JSON lines, streaming them by chunks
+#
+
+import argparse
+import json
+import os
+import struct
+import sys
+from collections import deque
+from itertools import chain, islice
+from time import perf_counter
+
+from .dollar_list import DollarList, DollarListException
+
+FORMATS = ('list', 'lb', 'json')
+# framings of binary $list records:
+# length, a 4 bytes little endian length before each record
+# hex, one hexadecimal record per line
+FRAMINGS = ('length', 'hex')
+
+LENGTH = struct.Struct('<I')
+
+def read_records(stream, fmt, framing):
+    """
+    Yield the undecoded records of a binary stream, one at a time
+    """
+    if fmt == 'list' and framing == 'length':
+        while True:
+            header = stream.read(LENGTH.size)
+            if not header:
+                return
+            if len(header) < LENGTH.size:
+                raise DollarListException("Truncated record length")
+            length, = LENGTH.unpack(header)
+            record = stream.read(length)
+            if len(record) < length:
+                raise DollarListException("Truncated record")
+            yield record
+    else:
+        for line in stream:
+            line = line.rstrip(b'\r\n')
+            if line:
+                yield line
+
+def _reject_constant(name):
+    # NaN, Infinity and -Infinity are accepted by json, they are not JSON numbers
+    raise DollarListException(f"{name} is not a JSON number")
+
+def decode_record(record, fmt):
+    """
+    Decode an undecoded record of read_records to a DollarList
+    """
+    if fmt == 'list':
+        return DollarList.from_bytes(record)
+    if fmt == 'hex':
+        return DollarList.from_bytes(bytes.fromhex(record.decode('ascii')))
+    if fmt == 'lb':
+        return DollarList.from_string(record.decode('utf-8'))
+    return DollarList.from_list(json.loads(record, parse_constant=_reject_constant))
+
+def encode_record(dollar_list, fmt):
+    """
+    Encode a DollarList to a framed record
+    The control characters of the strings are escaped in $lb(...) text,
+    a float nan or infinity can't be written as JSON
+    """
+    if fmt == 'list':
+        buffer = dollar_list.to_bytes()
+        return LENGTH.pack(len(buffer)) + buffer
+    if fmt == 'hex':
+        return dollar_list.to_bytes().hex().encode('ascii') + b'\n'
+    if fmt == 'lb':
+        text = str(dollar_list)
+    else:
+        # binary values are written as latin-1 strings, which are encoded
+        # back to the same bytes
+        text = json.dumps(dollar_list.to_list(), ensure_ascii=False, allow_nan=False,
+                          default=lambda value: value.decode('latin-1'))
+    return text.encode('utf-8') + b'\n'
+
+def convert_chunk(task):
+    """
+    Convert a chunk of records, in the main process or in a worker.
+    task is (index of the first record, records, input format, output format),
+    return the bytes to write
+    """
+    index, records, source, target = task
+    parts = []
+    for i, record in enumerate(records, index):
+        try:
+            parts.append(encode_record(decode_record(record, source), target))
+        except (DollarListException, ValueError, UnicodeError) as err:
+            raise DollarListException(f"record {i}: {err}") from None
+    return b''.join(parts)
+
+def chunks(records, chunksize, source, target):
+    """
+    Yield the tasks of convert_chunk, chunksize records each
+    """
+    index = 0
+    while True:
+        chunk = list(islice(records, chunksize))
+        if not chunk:
+            return
+        yield index, chunk, source, target
+        index += len(chunk)
+
+def convert(records, output, source, target, *, workers=1, chunksize=1000):
+    """
+    Convert the records and write them to output.
+    With many workers, at most two chunks per worker are pending,
+    the memory used does not depend on the size of the input.
+    Return the number of records and bytes written.
+    """
+    tasks = chunks(records, chunksize, source, target)
+    if workers > 1:
+        return _convert_in_workers(tasks, output, workers)
+    count = written = 0
+    for task in tasks:
+        data = convert_chunk(task)
+        output.write(data)
+        count += len(task[1])
+        written += len(data)
+    return count, written
+
+def _convert_in_workers(tasks, output, workers):
+    """
+    Convert the tasks of chunks in worker processes, like convert
+    """
+    count = written = 0
+    # multiprocessing is only needed with workers
+    from multiprocessing import Pool # pylint: disable=import-outside-toplevel
+    with Pool(workers) as pool:
+        # (number of records, result) of the chunks being converted, in order
+        pending = deque()
+        # None ends the tasks, the pending chunks are written
+        for task in chain(tasks, (None,)):
+            if task is not None:
+                pending.append((len(task[1]), pool.apply_async(convert_chunk, (task,))))
+            while pending and (len(pending) >= 2 * workers or task is None):
+                size, result = pending.popleft()
+                data = result.get()
+                output.write(data)
+                count += size
+                written += len(data)
+    return count, written
+
+class _CountingReader:
+    """
+    Binary stream that counts the bytes read, for --stats
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def __iter__(self):
+        for line in self.stream:
+            self.bytes_read += len(line)
+            yield line
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='iris-dollar-list',
+        description='Convert records between binary $list, $lb(...) text and JSON lines')
+    parser.add_argument('input', nargs='?', default='-',
+                        help='input file, - for stdin (default)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='output file, - for stdout (default)')
+    parser.add_argument('-f', '--from', dest='source', choices=FORMATS, default='list',
+                        help='input format (default: list)')
+    parser.add_argument('-t', '--to', dest='target', choices=FORMATS, default='json',
+                        help='output format (default: json)')
+    parser.add_argument('--in-framing', choices=FRAMINGS, default='length',
+                        help='framing of the input $list records (default: length)')
+    parser.add_argument('--out-framing', choices=FRAMINGS, default='length',
+                        help='framing of the output $list records (default: length)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of worker processes (default: 1, no worker)')
+    parser.add_argument('-c', '--chunksize', type=int, default=1000,
+                        help='number of records converted at once (default: 1000)')
+    parser.add_argument('--stats', action='store_true',
+                        help='print the throughput to stderr')
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.chunksize < 1:
+        parser.error('workers and chunksize must be at least 1')
+    return args
+
+def main(argv=None):
+    """
+    Entry point of python -m iris_dollar_list and of iris-dollar-list
+    """
+    args = parse_args(argv)
+    # the record formats, hex is a framing of list
+    source = 'hex' if args.source == 'list' and args.in_framing == 'hex' else args.source
+    target = 'hex' if args.target == 'list' and args.out_framing == 'hex' else args.target
+    input_file = output_file = None
+    start = perf_counter()
+    try:
+        input_file = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb') # pylint: disable=consider-using-with
+        output_file = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb') # pylint: disable=consider-using-with
+        stream = _CountingReader(input_file)
+        count, written = convert(read_records(stream, args.source, args.in_framing),
+                                 output_file, source, target,
+                                 workers=args.workers, chunksize=args.chunksize)
+        output_file.flush()
+    except DollarListException as err:
+        print(f'iris-dollar-list: {err}', file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # the reader of stdout has stopped, like head does,
+        # python must not fail again when it flushes stdout at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), output_file.fileno())
+        return 1
+    except OSError as err:
+        # a missing input file, an output file that can't be opened or written
+        print(f'iris-dollar-list: {err}', file=sys.stderr)
+        return 1
+    finally:
+        if input_file not in (None, sys.stdin.buffer):
+            input_file.close()
+        if output_file not in (None, sys.stdout.buffer):
+            output_file.close()
+    if args.stats:
+        elapsed = perf_counter() - start
+        rate = 1 / elapsed if elapsed > 0 else 0.0
+        print(f'{count} records, {stream.bytes_read} bytes read, {written} bytes written '
+              f'in {elapsed:.3f} s: {count * rate:.0f} records/s, '
+              f'{stream.bytes_read * rate / 1e6:.2f} MB/s',
+              file=sys.stderr)
+    return 0
@@ -0,0 +1,120 @@
+# Module that covers the IRIS collation of $list values
+# sort_key() turns a $list into bytes that compare like the list elements
+# collate as global subscripts, ^G(e1,e2,...):
+# null first, then canonical numbers in numeric order, then strings by
+# character code. Nested lists sort after strings, element by element.
+#
+
+import decimal
+import heapq
+import re
+
+from .dollar_list import DollarList
+from .dollartype import Dollartype
+
+# tags of the elements, a shorter list sorts first as its end is 0x00
+_END = b'\x00'
+_NULL = b'\x01'
+_NUMBER = b'\x02'
+_STRING = b'\x03'
+_LIST = b'\x04'
+
+# sign classes of the numbers
+_NEG_INFINITY = b'\x00'
+_NEGATIVE = b'\x01'
+_ZERO = b'\x02'
+_POSITIVE = b'\x03'
+_POS_INFINITY = b'\x04'
+_NAN = b'\x05'
+
+# bias of the exponent of the numbers, encoded on 4 bytes
+_EXPONENT_BIAS = 1 << 31
+
+# canonical form of a number in IRIS: no leading or trailing zero, no '+',
+# no exponent, '0' and not '-0'
+_CANONICAL_NUMBER = re.compile(r'-?(?:[1-9][0-9]*(?:\.[0-9]*[1-9])?|\.[0-9]*[1-9])|0')
+
+_INVERT = bytes(range(255, -1, -1))
+
+def sort_key(value):
+    """
+    Return the collation key of a DollarList or of a $list buffer
+    Comparing two keys as bytes gives the IRIS collation order of the lists
+    """
+    if not isinstance(value, DollarList):
+        value = DollarList.from_bytes(value)
+    parts = []
+    # iterator over the items of each open nested list
+    stack = [iter(value)]
+    while stack:
+        for item in stack[-1]:
+            if item.dollar_type == Dollartype.ITEM_PLACEHOLDER.value:
+                parts.append(_LIST)
+                stack.append(iter(item.value))
+                break
+            parts.append(_item_key(item))
+        else:
+            stack.pop()
+            if stack:
+                parts.append(_END)
+    return b''.join(parts)
+
+def sort_lists(buffers, reverse=False):
+    """
+    Return a new list of the $list buffers (or DollarLists) sorted
+    in IRIS collation order, each buffer is decoded only once
+    """
+    return sorted(buffers, key=sort_key, reverse=reverse)
+
+def merge_lists(*iterables):
+    """
+    Merge iterables of $list buffers (or DollarLists), each one already
+    sorted in IRIS collation order, into one sorted iterator
+    """
+    return heapq.merge(*iterables, key=sort_key)
+
+def _item_key(item):
+    typ = item.dollar_type
+    if typ in (Dollartype.ITEM_ASCII.value, Dollartype.ITEM_UNICODE.value):
+        value = item.value
+        if value is None:
+            return _NULL
+        if isinstance(value, bytes):
+            value = value.decode('latin-1')
+        if _CANONICAL_NUMBER.fullmatch(value):
+            return _NUMBER + _number_key(decimal.Decimal(value))
+        return _STRING + _string_key(value)
+    if typ in (Dollartype.ITEM_POSINT.value, Dollartype.ITEM_NEGINT.value,
+               Dollartype.ITEM_DOUBLE.value, Dollartype.ITEM_COMPACT_DOUBLE.value):
+        # the value of an int or a double is exact
+        return _NUMBER + _number_key(decimal.Decimal(item.value))
+    if typ in (Dollartype.ITEM_POSNUM.value, Dollartype.ITEM_NEGNUM.value):
+        # exact value from the raw value, the decoded value is a float
+        scale = item.raw_value[0]
+        if scale > 127:
+            scale -= 256
+        num = int.from_bytes(item.raw_value[1:], "little",
+                             signed=typ == Dollartype.ITEM_NEGNUM.value)
+        return _NUMBER + _number_key(decimal.Decimal(num).scaleb(scale))
+    return _NULL
+
+def _string_key(value):
+    # utf-8 keeps the order of the code points, 0x00 is escaped
+    # so that the end of the string sorts before any character
+    return value.encode('utf-8', 'surrogatepass').replace(b'\x00', b'\x00\xff') + b'\x00\x00'
+
+def _number_key(number):
+    if number.is_nan():
+        return _NAN
+    if number.is_infinite():
+        return _NEG_INFINITY if number < 0 else _POS_INFINITY
+    if number == 0:
+        return _ZERO
+    sign, digits, exponent = number.normalize().as_tuple()
+    # value is 0.d1d2...dn * 10 ** adjusted
+    adjusted = exponent + len(digits)
+    magnitude = ((adjusted + _EXPONENT_BIAS).to_bytes(4, "big")
+                 + bytes(0x30 + digit for digit in digits) + _END)
+    if sign:
+        return _NEGATIVE + magnitude.translate(_INVERT)
+    return _POSITIVE + magnitude
@@ -0,0 +1,135 @@
+# Module that covers the item level diff of two $list values
+# diff_lists() compares the encoded items of two buffers, without decoding
+# them, and returns a patch that patch_list() applies to the old buffer.
+# The patch is itself a $list:
+# $lb(crc32 of the old buffer, start, count, items, start, count, items, ...)
+# each change replaces count items of the old buffer, from the index start,
+# by the encoded items. The changes are in increasing order of start.
+#
+
+from difflib import SequenceMatcher
+from zlib import crc32
+
+from .dollar_list import DollarList, DollarListException, dumps, read_item_header
+
+# types of the items of a patch
+_ASCII = 1
+_POSINT = 4
+
+def split_items(buffer):
+    """
+    Return the encoded items of a $list buffer, as bytes, without decoding them
+    Raise DollarListException if an item is invalid
+    """
+    try:
+        return _split_items(buffer)
+    except ValueError as err:
+        raise DollarListException(f"Invalid $list: {err}") from None
+
+def _split_items(buffer):
+    # like split_items, raise ValueError
+    items = []
+    offset, end = 0, len(buffer)
+    while offset < end:
+        _, _, stop = read_item_header(buffer, offset, end)
+        items.append(buffer[offset:stop])
+        offset = stop
+    return items
+
+def diff_lists(old, new):
+    """
+    Return the patch from the old to the new $list buffer (or DollarList).
+    The items are compared by their encoding, a change in a nested list
+    replaces the whole nested list.
+    The patch is larger than the new buffer when most items changed,
+    compare their lengths to choose which one to send.
+    """
+    if isinstance(old, DollarList):
+        old = old.to_bytes()
+    if isinstance(new, DollarList):
+        new = new.to_bytes()
+    old_items = split_items(old)
+    new_items = split_items(new)
+    # the common first and last items are skipped before the matching,
+    # most updates change a few fields of the same record
+    limit = min(len(old_items), len(new_items))
+    prefix = 0
+    while prefix < limit and old_items[prefix] == new_items[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_items[-1 - suffix] == new_items[-1 - suffix]:
+        suffix += 1
+    old_items = old_items[prefix:len(old_items) - suffix]
+    new_items = new_items[prefix:len(new_items) - suffix]
+    values = [crc32(old)]
+    if old_items or new_items:
+        matcher = SequenceMatcher(None, old_items, new_items, autojunk=False)
+        for tag, old_start, old_stop, new_start, new_stop in matcher.get_opcodes():
+            if tag != 'equal':
+                values.append(prefix + old_start)
+                values.append(old_stop - old_start)
+                values.append(b''.join(new_items[new_start:new_stop]))
+    return dumps(values)
+
+def read_patch(patch):
+    """
+    Return the crc32 of the old buffer and the (start, count, items)
+    of the changes of a patch
+    Raise DollarListException if the patch is invalid
+    """
+    values = []
+    offset, end = 0, len(patch)
+    try:
+        while offset < end:
+            typ, start, offset = read_item_header(patch, offset, end)
+            # an int, except the items of each change
+            if len(values) % 3 == 0 and len(values) > 0:
+                if typ != _ASCII:
+                    raise ValueError("Invalid type")
+                items = patch[start:offset]
+                _split_items(items)
+                values.append(items)
+            else:
+                if typ != _POSINT:
+                    raise ValueError("Invalid type")
+                values.append(int.from_bytes(patch[start:offset], 'little'))
+    except ValueError as err:
+        raise DollarListException(f"Invalid patch: {err}") from None
+    if len(values) % 3 != 1:
+        raise DollarListException("Invalid patch: incomplete change")
+    changes = [tuple(values[i:i + 3]) for i in range(1, len(values), 3)]
+    return values[0], changes
+
+def patch_list(old, patch):
+    """
+    Apply a patch of diff_lists to the old $list buffer (or DollarList),
+    return the new buffer.
+    The items are copied as bytes, nothing is decoded or encoded.
+    Raise DollarListException if the patch was not made from this buffer,
+    or if the patch or the buffer is invalid
+    """
+    if isinstance(old, DollarList):
+        old = old.to_bytes()
+    checksum, changes = read_patch(patch)
+    if checksum != crc32(old):
+        raise DollarListException("The patch was not made from this buffer")
+    # offsets of the old items, and of the end of the buffer
+    offsets = [0]
+    offset, end = 0, len(old)
+    try:
+        while offset < end:
+            _, _, offset = read_item_header(old, offset, end)
+            offsets.append(offset)
+    except ValueError as err:
+        raise DollarListException(f"Invalid $list: {err}") from None
+    parts = []
+    # index of the first old item not copied yet
+    position = 0
+    for start, count, items in changes:
+        if start < position or start + count >= len(offsets):
+            raise DollarListException("Invalid patch: change out of the list")
+        parts.append(old[offsets[position]:offsets[start]])
+        parts.append(items)
+        position = start + count
+    parts.append(old[offsets[position]:])
+    return b''.join(parts)
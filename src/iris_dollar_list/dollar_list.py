@@ -4,43 +4,171 @@
 # to store the data in a list of objects
 #
 
-from dataclasses import dataclass
-from enum import Enum
+# pylint: disable=too-many-lines
+# the codec, the registry and DollarList share the private state of this module
+
+# only cheap modules are imported here, decimal support, the Dollartype
+# enum and the other features of the package are loaded on first use.
+# The lock of the registry comes from _thread, the documented low-level
+# module of threading: threading.Lock is _thread.allocate_lock, and
+# threading imports more modules than the package itself (see test_import)
+import math
 import struct
-from typing import Any,List
-import decimal
-
-class Dollartype(Enum):
-    ITEM_UNDEF = -1
-    ITEM_PLACEHOLDER = 0
-    ITEM_ASCII = 1
-    ITEM_UNICODE = 2
-    ITEM_POSINT = 4
-    ITEM_NEGINT = 5
-    ITEM_POSNUM = 6
-    ITEM_NEGNUM = 7
-    ITEM_DOUBLE = 8
-    ITEM_COMPACT_DOUBLE = 9
-
-@dataclass
+import weakref
+from _thread import allocate_lock
+
+# Dollartype is loaded on first use, see __getattr__
+__all__ = [
+    'DollarItem', 'DollarItems', 'DollarList', 'DollarListException',
+    'DollarListReader', 'DollarListWriter', 'Dollartype', 'SCALAR_DECODERS', # pylint: disable=undefined-all-variable
+    'decode_items', 'disable_stats', 'dumps', 'enable_stats', 'get_stats',
+    'loads', 'read_item_header', 'register_decoder', 'register_encoder',
+    'unregister_encoder',
+]
+
+# instrumentation of the hot paths, None when disabled
+_stats = None # pylint: disable=invalid-name
+
+def enable_stats(callback=None):
+    """
+    Enable the instrumentation of DollarListReader, DollarListWriter
+    and DollarList.from_string, return the DollarListStats filled by them.
+    callback is called with (phase, elapsed seconds, bytes) at the end
+    of each decode, encode and parse.
+    """
+    from .stats import DollarListStats # pylint: disable=import-outside-toplevel
+    global _stats # pylint: disable=global-statement
+    _stats = DollarListStats(callback)
+    return _stats
+
+def disable_stats():
+    """
+    Disable the instrumentation, return the last DollarListStats
+    """
+    global _stats # pylint: disable=global-statement
+    stats, _stats = _stats, None
+    return stats
+
+def get_stats():
+    """
+    Return the DollarListStats being filled, None if disabled
+    """
+    return _stats
+
+# values of the Dollartype enum, used by the codec without creating the enum
+_ITEM_UNDEF = -1
+_ITEM_PLACEHOLDER = 0
+_ITEM_ASCII = 1
+_ITEM_UNICODE = 2
+_ITEM_POSINT = 4
+_ITEM_NEGINT = 5
+_ITEM_POSNUM = 6
+_ITEM_NEGNUM = 7
+_ITEM_DOUBLE = 8
+_ITEM_COMPACT_DOUBLE = 9
+
+# number of parts joined in one block by DollarList._write_str
+_STR_BLOCK_PARTS = 8192
+
+# 2 bytes headers of the numbers by length of the raw value,
+# for the packed encoders of DollarListWriter
+_POSINT_HEADERS = tuple(bytes((length + 2, _ITEM_POSINT)) for length in range(254))
+_NEGINT_HEADERS = tuple(bytes((length + 2, _ITEM_NEGINT)) for length in range(254))
+_POSNUM_HEADERS = tuple(bytes((length + 2, _ITEM_POSNUM)) for length in range(254))
+_NEGNUM_HEADERS = tuple(bytes((length + 2, _ITEM_NEGNUM)) for length in range(254))
+_DOUBLE = struct.Struct('<d')
+# scale byte of the numbers, indexed by the scale from -128 to 127
+_SCALES = tuple(scale.to_bytes(1, "little", signed=True) for scale in range(-128, 128))
+
+def __getattr__(name):
+    # Dollartype is created on first use, enum is slow to import
+    if name == 'Dollartype':
+        from .dollartype import Dollartype # pylint: disable=import-outside-toplevel
+        return Dollartype
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 class DollarItem:
     """
     A class that represents a dollar item
     """
-    # type of the item
-    dollar_type: Dollartype = Dollartype.ITEM_UNDEF
-    # value of the item
-    value: Any = None
-    # raw data of the item
-    raw_value: bytes = b''
-    # raw data of the item + meta data
-    buffer: bytes = b''
-    # offset of the item in the list buffer
-    offset: int = 0
-    # length of the item in defined in the meta data
-    meta_value_length: int = 0
-    # length of the meta data
-    meta_offset: int = 0
+    # a plain class with slots, faster to create than a dataclass
+    __slots__ = (
+        # type of the item, a value of Dollartype
+        'dollar_type',
+        # value of the item
+        'value',
+        # raw data of the item, see raw_value
+        '_raw_value',
+        # raw data of the item + meta data, see buffer
+        '_buffer',
+        # offset of the item in the list buffer
+        'offset',
+        # length of the item in defined in the meta data
+        'meta_value_length',
+        # length of the meta data
+        'meta_offset',
+    )
+
+    # the fields of the dataclass it replaces, in the same order,
+    # the fields after dollar_type are keyword-only
+    def __init__(self, dollar_type=_ITEM_UNDEF, *, value=None, raw_value=b'', buffer=b'',
+                 offset=0, meta_value_length=0, meta_offset=0):
+        self.dollar_type = dollar_type
+        self.value = value
+        self._raw_value = raw_value
+        self._buffer = buffer
+        self.offset = offset
+        self.meta_value_length = meta_value_length
+        self.meta_offset = meta_offset
+
+    @property
+    def raw_value(self):
+        """
+        Raw data of the item.
+        A decoded nested list holds a view of the decoded buffer,
+        copied to bytes on first access
+        """
+        raw_value = self._raw_value
+        if raw_value.__class__ is memoryview:
+            raw_value = self._raw_value = raw_value.tobytes()
+        return raw_value
+
+    @raw_value.setter
+    def raw_value(self, raw_value):
+        self._raw_value = raw_value
+
+    @property
+    def buffer(self):
+        """
+        Raw data of the item + meta data, a view like raw_value
+        """
+        buffer = self._buffer
+        if buffer.__class__ is memoryview:
+            buffer = self._buffer = buffer.tobytes()
+        return buffer
+
+    @buffer.setter
+    def buffer(self, buffer):
+        self._buffer = buffer
+
+    # the public names of the slots
+    _FIELDS = ('dollar_type', 'value', 'raw_value', 'buffer',
+               'offset', 'meta_value_length', 'meta_offset')
+
+    def _fields(self):
+        return tuple(getattr(self, name) for name in self._FIELDS)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    # mutable, like the dataclass it replaces
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self._FIELDS)
+        return f'DollarItem({fields})'
 
 
 # create DollarList exceptions
@@ -49,6 +177,80 @@ class DollarListException(Exception):
     Base class for DollarList exceptions
     """
 
+def read_item_header(buffer,offset,end=None):
+    """
+    Read the header of the item starting at offset without decoding it.
+    Return a tuple (type, start, stop) where buffer[start:stop] is the raw
+    value of the item and stop is the offset of the next item.
+    The item must end before end, the end of the buffer by default.
+    Raise ValueError if the header or the length is invalid.
+    """
+    size = len(buffer) if end is None else end
+    if offset + 1 >= size:
+        raise ValueError("Invalid length")
+    length = buffer[offset]
+    if length != 0:
+        # 2 bytes header, length includes the header
+        start = offset + 2
+        stop = offset + length
+        if length < 2:
+            raise ValueError("Invalid length")
+    else:
+        if offset + 3 >= size:
+            raise ValueError("Invalid length")
+        length = buffer[offset + 1] | (buffer[offset + 2] << 8)
+        if length != 0:
+            # 4 bytes header, length includes the type byte
+            start = offset + 4
+        else:
+            if offset + 7 >= size:
+                raise ValueError("Invalid length")
+            length = (
+                    buffer[offset + 3]
+                    | (buffer[offset + 4] << 8)
+                    | (buffer[offset + 5] << 16)
+                    | (buffer[offset + 6] << 24)
+            )
+            # 8 bytes header, length includes the type byte
+            start = offset + 8
+            if length == 0:
+                raise ValueError("Invalid length")
+        stop = start + length - 1
+    if stop > size:
+        raise ValueError("Invalid length")
+    typ = buffer[start - 1]
+    # 0 is not a type of the wire, it marks the decoded sub-lists
+    if typ > 9 or typ == 0:
+        raise ValueError("Invalid type")
+    return typ, start, stop
+
+def read_headers(buffer,start,end,max_items=None,max_item_size=None,*,headers=None):
+    """
+    Read the headers of the items between start and end without decoding them.
+    This is the walk that tells if an ascii value is a nested list, shared by
+    decode_items, decode_table and validate: all its headers must be read
+    before a value is decoded, so that a value which is not a list fails fast.
+    Return the list of (type, start, stop) of the items, appended to headers
+    if given, it holds the items read before an error.
+    Raise ValueError if an item can't be read
+    Raise DollarListException if there are more than max_items items
+    or an item is larger than max_item_size
+    """
+    if headers is None:
+        headers = []
+    offset = start
+    limited = max_items is not None or max_item_size is not None
+    while offset < end:
+        header = read_item_header(buffer, offset, end)
+        if limited:
+            if max_items is not None and len(headers) == max_items:
+                raise DollarListException(f"More than {max_items} items")
+            if max_item_size is not None and header[2] - header[1] > max_item_size:
+                raise DollarListException(f"Item larger than {max_item_size} bytes")
+        headers.append(header)
+        offset = header[2]
+    return headers
+
 class DollarListReader:
 
     def __init__(self, buffer:bytes):
@@ -62,38 +264,38 @@ class DollarListReader:
         """
         read the buffer and return a list of DollarItems
         """
+        stats = _stats
+        if stats is None:
+            self.read_items()
+            return
+        start = stats.begin('decode')
+        try:
+            self.read_items()
+        finally:
+            stats.end('decode', start, len(self.buffer))
+
+    def read_items(self):
         while self.next_offset < len(self.buffer):
             item = self.get_next_item()
             self.items.append(item)
 
     def get_item_length(self,offset):
-        meta_offset = 0
-        # if first byte is 0, then length is next 2 bytes
-        if self.buffer[offset] == 0:
-            length = self.buffer[offset + 1] | (self.buffer[offset + 2] << 8)
-            meta_offset = 4
-            # if the length is still 0, then the length is the next 4 bytes
-            if length == 0:
-                length = (
-                        self.buffer[offset+3]
-                        | (self.buffer[offset + 4] << 8)
-                        | (self.buffer[offset + 5] << 16)
-                        | (self.buffer[offset + 6] << 24)
-                )
-                meta_offset = 8
-        else:
-            length = self.buffer[offset]
-            meta_offset = 2
-        if length > len(self.buffer) or length <= 0:
-            raise ValueError("Invalid length")
-        return length, meta_offset
+        """
+        Return the length defined in the meta data of the item
+        and the length of the meta data (2, 4 or 8)
+        """
+        _, start, stop = read_item_header(self.buffer, offset)
+        meta_offset = start - offset
+        if meta_offset == 2:
+            return stop - offset, meta_offset
+        return stop - start + 1, meta_offset
 
     def get_item_type(self,offset,meta_offset=None):
         if meta_offset is None:
             meta_offset = self.get_item_length(offset)[1]
         typ = self.buffer[offset+meta_offset-1]
             # if result is not between 0 and 9, then raise an exception
-        if typ < 0 or typ > 9:
+        if typ <= 0 or typ > 9:
             raise ValueError("Invalid type")
         return typ
 
@@ -128,24 +330,10 @@ class DollarListReader:
                 )
         if raw_value is None:
             raw_value = self.get_item_raw_value(offset,meta_offset,length)
-        if typ == Dollartype.ITEM_ASCII.value:
+        if typ == _ITEM_ASCII:
             val = self.get_ascii(raw_value)
-        elif typ == Dollartype.ITEM_UNICODE.value:
-            val = raw_value.decode('utf-16')
-        elif typ == Dollartype.ITEM_POSINT.value:
-            val = self.get_posint(raw_value)
-        elif typ == Dollartype.ITEM_NEGINT.value:
-            val = self.get_negint(raw_value)
-        elif typ == Dollartype.ITEM_POSNUM.value:
-            val = self.get_posnum(raw_value)
-        elif typ == Dollartype.ITEM_NEGNUM.value:
-            val = self.get_negnum(raw_value)
-        elif typ == Dollartype.ITEM_DOUBLE.value:
-            val = struct.unpack('<d',raw_value)[0]
-        elif typ == Dollartype.ITEM_COMPACT_DOUBLE.value:
-            val = struct.unpack('<f',raw_value)[0]
-        else:
-            val = None
+        elif typ in SCALAR_DECODERS:
+            val = SCALAR_DECODERS[typ](raw_value)
         return val
 
     def get_ascii(self,raw_value):
@@ -156,37 +344,86 @@ class DollarListReader:
         """
         if raw_value == b'':
             return None
+        stats = _stats
         try:
-            return DollarList.from_bytes(raw_value)
+            value = DollarList.from_bytes(raw_value)
+            if stats is not None:
+                stats.count_sublists(1, 0)
+            return value
         except ValueError:
+            if stats is not None:
+                stats.count_sublists(1, 1)
             try:
                 return raw_value.decode('ascii')
             except UnicodeDecodeError:
                 return raw_value
 
-    def get_posint(self,raw_value):
+    @staticmethod
+    def get_unicode(raw_value):
+        """
+        Decode the value as utf-16 little endian, without BOM like IRIS.
+        A leading U+FEFF is a character of the string and is kept.
+        IRIS strings are 16 bits code units, a lone surrogate is kept.
+        """
+        return raw_value.decode('utf-16-le','surrogatepass')
+
+    @staticmethod
+    def get_legacy_unicode(raw_value):
+        """
+        Decode the value like get_unicode, but drop a leading BOM,
+        for the unicode values written with a BOM by previous versions.
+        Opt in with register_decoder(Dollartype.ITEM_UNICODE, get_legacy_unicode),
+        a string starting with U+FEFF loses it.
+        """
+        if raw_value[:2] == b'\xff\xfe':
+            raw_value = raw_value[2:]
+        return raw_value.decode('utf-16-le','surrogatepass')
+
+    @staticmethod
+    def get_posint(raw_value):
         return int.from_bytes(raw_value, "little")
 
-    def get_negint(self,raw_value):
+    @staticmethod
+    def get_negint(raw_value):
         return int.from_bytes(raw_value, "little",signed=True)
 
-    def get_posnum(self,raw_value):
-        num = self.get_posint(raw_value[1:])
+    @staticmethod
+    def get_posnum(raw_value):
+        if raw_value == b'':
+            # no scale
+            raise ValueError("Invalid length")
+        num = DollarListReader.get_posint(raw_value[1:])
         scale = raw_value[0]
         if scale > 127:
             scale -= 256
-        decstr = str(num) + "E" + str(scale)
-        dec = decimal.Decimal(decstr)
-        return float(dec)
+        # float() rounds the decimal string like Decimal does
+        return float(str(num) + "E" + str(scale))
 
-    def get_negnum(self,raw_value):
-        num = self.get_negint(raw_value[1:])
+    @staticmethod
+    def get_negnum(raw_value):
+        if raw_value == b'':
+            # no scale
+            raise ValueError("Invalid length")
+        num = DollarListReader.get_negint(raw_value[1:])
         scale = raw_value[0]
         if scale > 127:
             scale -= 256
-        decstr = str(num) + "E" + str(scale)
-        dec = decimal.Decimal(decstr)
-        return float(dec)
+        # float() rounds the decimal string like Decimal does
+        return float(str(num) + "E" + str(scale))
+
+    @staticmethod
+    def get_double(raw_value):
+        try:
+            return struct.unpack('<d',raw_value)[0]
+        except struct.error:
+            raise ValueError("Invalid length") from None
+
+    @staticmethod
+    def get_compact_double(raw_value):
+        try:
+            return struct.unpack('<f',raw_value)[0]
+        except struct.error:
+            raise ValueError("Invalid length") from None
 
     def get_item(self,offset) -> DollarItem:
         item = DollarItem()
@@ -202,6 +439,9 @@ class DollarListReader:
         # if value is a list change the typ to ITEM_PLACEHOLDER
         if isinstance(item.value,DollarList):
             item.dollar_type = 0
+        stats = _stats
+        if stats is not None:
+            stats.count_decoded((item,))
         return item
 
     def get_next_item(self) -> DollarItem:
@@ -219,6 +459,273 @@ class DollarListReader:
             response = offset + length + meta_offset - 1
         return response
 
+# decoders of the raw value of the item types other than ascii,
+# see register_decoder()
+SCALAR_DECODERS = {
+    _ITEM_UNICODE: DollarListReader.get_unicode,
+    _ITEM_POSINT: DollarListReader.get_posint,
+    _ITEM_NEGINT: DollarListReader.get_negint,
+    _ITEM_POSNUM: DollarListReader.get_posnum,
+    _ITEM_NEGNUM: DollarListReader.get_negnum,
+    _ITEM_DOUBLE: DollarListReader.get_double,
+    _ITEM_COMPACT_DOUBLE: DollarListReader.get_compact_double,
+}
+
+def decode_items(buffer,max_depth=None,owner=None,limits=None,usage=None):
+    """
+    Decode a buffer to a list of DollarItems like DollarListReader does,
+    without recursion: the nested lists are decoded with an explicit stack
+    of offsets in the original buffer, so the depth is not limited by the
+    python stack and no sub-buffer is handed to a new reader.
+    The nested lists and the items holding them keep views of the buffer,
+    their bytes are not copied, a decode allocates O(len(buffer)).
+    A non empty ascii value is a nested list if all its items can be read,
+    like get_ascii does.
+    A header of another width than the one of the writer, the shortest,
+    is written again like the writer does in the items and the memoized
+    bytes of the lists, so that equal values have equal bytes.
+    No value is decoded for it.
+    owner, if given, is the DollarList set the items and their bytes,
+    it is registered as the parent of the nested lists of the first level.
+    limits is a DollarListLimits, usage a DollarListUsage filled with
+    what the decode allocated.
+    Raise DollarListException if a nested list is deeper than max_depth
+    or if the buffer is over a limit.
+    """
+    decoder = _ItemDecoder(limits, max_depth)
+    stats = _stats
+    if stats is None:
+        items = decoder.decode(buffer, owner)
+    else:
+        start = stats.begin('decode')
+        try:
+            items = decoder.decode(buffer, owner)
+        finally:
+            for level in decoder.levels:
+                stats.count_decoded(level)
+            stats.count_sublists(decoder.attempts, decoder.failures)
+            stats.end('decode', start, len(buffer))
+    if usage is not None:
+        decoder.report(usage)
+    return items
+
+class _ItemDecoder: # pylint: disable=too-many-instance-attributes
+    """
+    The decode of decode_items: the limits and what was decoded so far
+    """
+    __slots__ = ('max_items', 'max_depth', 'max_item_size', 'max_bytes',
+                 'total_items', 'total_bytes', 'total_depth',
+                 'levels', 'lists', 'attempts', 'failures')
+
+    def __init__(self, limits, max_depth):
+        self.max_items = self.max_item_size = self.max_bytes = None
+        if limits is not None:
+            self.max_items = limits.max_items
+            self.max_item_size = limits.max_item_size
+            self.max_bytes = limits.max_bytes
+            if limits.max_depth is not None and (max_depth is None or limits.max_depth < max_depth):
+                max_depth = limits.max_depth
+        self.max_depth = max_depth
+        self.total_items = self.total_bytes = 0
+        self.total_depth = 1
+        # items of each decoded list and sub-lists tried and failed, for the stats
+        self.levels = []
+        # (list, item holding it, index of its parent) of each level
+        self.lists = []
+        self.attempts = self.failures = 0
+
+    def decode(self, buffer, owner): # pylint: disable=too-many-locals
+        """
+        Decode the items of buffer and of its nested lists
+        """
+        # the views of the nested lists must not see a later change of the buffer
+        if not isinstance(buffer, bytes):
+            buffer = bytes(buffer)
+        view = memoryview(buffer)
+        self.count_bytes(len(buffer))
+        # the limits of the first level are checked while its headers are read,
+        # the nested lists are smaller than the item that holds them
+        items, candidates, minimal = _decode_level(buffer, 0, len(buffer),
+                                                   self.max_items, self.max_item_size)
+        self.levels.append(items)
+        self.lists.append((owner, None, None))
+        self.total_items = len(items)
+        # indexes of the levels to write again with the shortest headers
+        wide = set() if minimal else {0}
+        # (item, offset, start, stop, depth, parent index) of the ascii values that may be lists
+        stack = [candidate + (2, 0) for candidate in candidates]
+        while stack:
+            item, offset, value_start, value_stop, depth, parent = stack.pop()
+            self.attempts += 1
+            try:
+                sub_items, candidates, minimal = self.decode_level(buffer, value_start,
+                                                                   value_stop, depth)
+            except ValueError:
+                self.failures += 1
+                _decode_string(item, buffer, offset, value_start, value_stop)
+                continue
+            # views of the buffer, the items of the nested list hold the copies
+            item.raw_value = view[value_start:value_stop]
+            item.buffer = view[offset:value_stop]
+            sublist = DollarList()
+            sublist.set_items(sub_items, view[value_start:value_stop])
+            if self.lists[parent][0] is not None:
+                sublist.add_parent(self.lists[parent][0])
+            item.value = sublist
+            item.dollar_type = _ITEM_PLACEHOLDER
+            index = len(self.levels)
+            if not minimal or value_start - offset != item.meta_offset:
+                wide.add(index)
+            self.levels.append(sub_items)
+            self.lists.append((sublist, item, parent))
+            stack.extend(candidate + (depth + 1, index) for candidate in candidates)
+        if owner is not None:
+            owner.set_items(items, buffer)
+        if wide:
+            self.rewrite(wide)
+        return items
+
+    def rewrite(self, wide):
+        """
+        Write again the bytes of the levels in wide with the shortest headers,
+        and of the levels holding them, the deepest first.
+        The headers of their items are already the shortest ones,
+        their offsets are moved to the new bytes.
+        """
+        writer = DollarListWriter()
+        # a nested list is always decoded after the list holding it
+        for index in range(len(self.levels) - 1, -1, -1):
+            if index not in wide:
+                continue
+            dollar_list, item, parent = self.lists[index]
+            offset = 0
+            for level_item in self.levels[index]:
+                level_item.offset = offset
+                offset += len(level_item.buffer)
+            buffer = b''.join([level_item.buffer for level_item in self.levels[index]])
+            if dollar_list is not None:
+                dollar_list.set_items(self.levels[index], buffer)
+            if item is not None:
+                encoded = writer.create_from_dollar_list(dollar_list)
+                item.raw_value = encoded.raw_value
+                item.buffer = encoded.buffer
+                item.meta_offset = len(encoded.buffer) - len(encoded.raw_value)
+                item.meta_value_length = len(encoded.raw_value) + (
+                    2 if item.meta_offset == 2 else 1)
+                wide.add(parent)
+
+    def decode_level(self, buffer, start, stop, depth):
+        """
+        Decode the ascii value between start and stop as a nested list,
+        at most the items left to max_items are created.
+        Raise ValueError if it is not a list
+        """
+        left = None if self.max_items is None else self.max_items - self.total_items
+        try:
+            items, candidates, minimal = _decode_level(buffer, start, stop, left)
+        except DollarListException:
+            # more items than left, over the limit only if it is a list
+            # the rest of the headers is walked without keeping them
+            offset = start
+            while offset < stop:
+                offset = read_item_header(buffer, offset, stop)[2]
+            items = None
+        # a value is only counted once it is known to be a list,
+        # the level allocated is smaller than the item that holds it
+        if self.max_depth is not None and depth > self.max_depth:
+            raise DollarListException(f"Nested lists deeper than {self.max_depth}")
+        if items is None:
+            raise DollarListException(f"More than {self.max_items} items")
+        self.total_items += len(items)
+        self.count_bytes(stop - start)
+        self.total_depth = max(self.total_depth, depth)
+        return items, candidates, minimal
+
+    def count_bytes(self, length):
+        self.total_bytes += length
+        if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+            raise DollarListException(f"More than {self.max_bytes} bytes decoded")
+
+    def report(self, usage):
+        """
+        Add what was decoded to a DollarListUsage
+        """
+        usage.items += self.total_items
+        usage.lists += len(self.levels) - 1
+        usage.depth = max(usage.depth, self.total_depth)
+        usage.bytes_decoded += self.total_bytes
+        # the items holding a nested list are views of the buffer
+        usage.bytes_allocated += sum(len(item.raw_value) + len(item.buffer)
+                                     for level in self.levels for item in level
+                                     if item.dollar_type != _ITEM_PLACEHOLDER)
+
+def _decode_string(item, buffer, offset, start, stop):
+    """
+    Decode the candidate item that is not a nested list as ascii, or binary,
+    its bytes are copied like the bytes of the scalar values
+    """
+    raw_value = item.raw_value = buffer[start:stop]
+    if start - offset == item.meta_offset:
+        item.buffer = buffer[offset:stop]
+    else:
+        item.buffer = DollarListWriter.get_meta_value_length(raw_value) + b'\x01' + raw_value
+    try:
+        item.value = raw_value.decode('ascii')
+    except UnicodeDecodeError:
+        item.value = raw_value
+
+def _decode_level(buffer,start,end,max_items=None,max_item_size=None): # pylint: disable=too-many-locals
+    """
+    Decode the items between start and end, the ascii values are left
+    undecoded and returned as candidates (item, offset, start, stop),
+    their raw value and buffer are set by the caller.
+    A header of another width than the writer's is written again like the writer does.
+    Return the items, the candidates and False if a header was written again
+    Raise ValueError if an item can't be read
+    Raise DollarListException if there are more than max_items items
+    or an item is larger than max_item_size, before creating any item
+    """
+    items = []
+    candidates = []
+    minimal = True
+    offset = start
+    for typ, value_start, stop in read_headers(buffer, start, end, max_items, max_item_size):
+        meta_offset = value_start - offset
+        length = stop - value_start
+        if meta_offset != 2 or length > 253:
+            # the width of the header the writer emits for this length
+            width = 2 if length < 254 else 4 if length < 65534 else 8
+            if meta_offset != width:
+                minimal = False
+                meta_offset = width
+        if typ == _ITEM_ASCII and length:
+            item = DollarItem(
+                dollar_type=typ,
+                offset=offset - start,
+                meta_value_length=length + 2 if meta_offset == 2 else length + 1,
+                meta_offset=meta_offset,
+            )
+            candidates.append((item, offset, value_start, stop))
+        else:
+            raw_value = buffer[value_start:stop]
+            if meta_offset == value_start - offset:
+                item_buffer = buffer[offset:stop]
+            else:
+                item_buffer = (DollarListWriter.get_meta_value_length(raw_value)
+                               + typ.to_bytes(1, "little") + raw_value)
+            item = DollarItem(
+                dollar_type=typ,
+                value=SCALAR_DECODERS[typ](raw_value) if typ in SCALAR_DECODERS else None,
+                raw_value=raw_value,
+                buffer=item_buffer,
+                offset=offset - start,
+                meta_value_length=length + 2 if meta_offset == 2 else length + 1,
+                meta_offset=meta_offset,
+            )
+        items.append(item)
+        offset = stop
+    return items, candidates, minimal
+
 class DollarListWriter:
     """
     Convert a DollarList to it's byte form
@@ -233,41 +740,107 @@ class DollarListWriter:
         Create a DollarItem from a python object
         Based on the item type convert it
         """
-        rsp = None
-        if isinstance(item,DollarItem):
-            rsp = item
-        elif isinstance(item,DollarList):
-            rsp = DollarItem(value=item,dollar_type=0,raw_value=item.to_bytes()
-            ,buffer=self.get_meta_value_length(item.to_bytes())+
-                Dollartype.ITEM_ASCII.value.to_bytes(1, "little")+
-                item.to_bytes())
-        elif isinstance(item,str) or item is None:
-            rsp = self.create_from_string(item)
-        elif isinstance(item,int):
-            rsp = self.create_from_int(item)
-        elif isinstance(item,float):
-            rsp = self.create_from_float(item)
-        elif isinstance(item,bytes):
-            raise DollarListException("Bytes are not supported")
-        else:
-            raise DollarListException("Invalid item type")
+        stats = _stats
+        if stats is None:
+            return self.convert_item(item)
+        start = stats.begin('encode')
+        nbytes = 0
+        try:
+            rsp = self.convert_item(item)
+            nbytes = len(rsp.buffer)
+            stats.count_encoded(rsp)
+        finally:
+            stats.end('encode', start, nbytes)
         return rsp
 
+    def convert_item(self,item):
+        """
+        Convert a python object to a DollarItem
+        """
+        encoder = _ENCODER_CACHE.get(type(item))
+        if encoder is None:
+            encoder = _find_encoder(type(item))
+        return encoder(self,item)
+
+    def create_from_dollar_list(self,item):
+        """
+        Create a DollarItem from a DollarList
+        """
+        raw_value = item.to_bytes()
+        return DollarItem(
+            value=item,
+            dollar_type=_ITEM_PLACEHOLDER,
+            raw_value=raw_value,
+            buffer=(self.get_meta_value_length(raw_value)
+                    +_ITEM_ASCII.to_bytes(1, "little")
+                    +raw_value)
+        )
+
+    def create_from_bytes(self,item):
+        """
+        Create a DollarItem from bytes, stored as a binary ascii value
+        """
+        raw_value = bytes(item)
+        if raw_value == b'':
+            return self.create_null_item()
+        lenght = self.get_meta_value_length(raw_value)
+        buffer = lenght + _ITEM_ASCII.to_bytes(1, "little") + raw_value
+        return DollarItem(
+            value=raw_value,
+            raw_value=raw_value,
+            buffer=buffer,
+            dollar_type=_ITEM_ASCII,
+        )
+
+    def create_from_bool(self,item):
+        """
+        Create a DollarItem from a boolean, stored as 1 or 0 like IRIS
+        """
+        return self.create_posint(int(item))
+
+    def create_from_decimal(self,item):
+        """
+        Create a DollarItem from a Decimal, without rounding
+        """
+        sign, digits, scale = item.as_tuple()
+        if not isinstance(scale, int):
+            raise DollarListException("Invalid decimal")
+        num = int(''.join(map(str,digits)))
+        if sign:
+            num = -num
+        if not -128 <= scale <= 127:
+            raise DollarListException("Decimal exponent out of range")
+        if num < 0:
+            typ = _ITEM_NEGNUM
+            num_bytes = num.to_bytes(((~num).bit_length() + 8) // 8, "little",signed=True)
+        else:
+            typ = _ITEM_POSNUM
+            num_bytes = num.to_bytes((num.bit_length() + 7) // 8, "little")
+        raw_value = scale.to_bytes(1, "little",signed=True) + num_bytes
+        lenght = self.get_meta_value_length(raw_value)
+        buffer = lenght + typ.to_bytes(1, "little") + raw_value
+        return DollarItem(
+            dollar_type=typ,
+            value=item,
+            raw_value=raw_value,
+            buffer=buffer
+        )
+
     def create_from_string(self,item):
         """
         Create a DollarItem from a string
+        The narrowest encoding is chosen once from the highest character:
+        ascii, latin-1 (both as ITEM_ASCII) or utf-16 (ITEM_UNICODE)
         """
         response = DollarItem()
         if item == '' or item is None:
             response = self.create_null_item()
+        elif item.isascii():
+            response = self.create_from_ascii(item,'ascii')
+        elif max(item) <= '\xff':
+            response = self.create_from_ascii(item,'latin-1')
         else:
-            try:
-                response = self.create_from_ascii(item,'ascii')
-            except UnicodeEncodeError:
-                try:
-                    response = self.create_from_ascii(item,'latin-1')
-                except UnicodeEncodeError:
-                    response = self.create_from_ascii(item,'utf-16')
+            response = self.create_from_ascii(item,'utf-16')
         return response
 
     def create_null_item(self):
@@ -277,25 +850,27 @@ class DollarListWriter:
         raw_value = b''
         item_value = None
         lenght = b'\x02'
-        buffer = lenght + Dollartype.ITEM_ASCII.value.to_bytes(1, "little") + raw_value
+        buffer = lenght + _ITEM_ASCII.to_bytes(1, "little") + raw_value
         return DollarItem(
             value=item_value,
             raw_value=raw_value,
             buffer=buffer,
-            dollar_type=Dollartype.ITEM_ASCII.value,
+            dollar_type=_ITEM_ASCII,
         )
 
     def create_from_ascii(self,item,locale):
         """
         Create a DollarItem from a string
+        utf-16 is written little endian without BOM, like IRIS does
         """
-        raw_value = item.encode(locale)
+        if locale in ('utf-16', 'utf-16-le'):
+            raw_value = item.encode('utf-16-le','surrogatepass')
+            typ = _ITEM_UNICODE
+        else:
+            raw_value = item.encode(locale)
+            typ = _ITEM_ASCII
         item_value = item
         lenght = self.get_meta_value_length(raw_value)
-        if locale != 'utf-16':
-            typ = Dollartype.ITEM_ASCII.value
-        else:
-            typ = Dollartype.ITEM_UNICODE.value
         buffer = lenght + typ.to_bytes(1, "little") + raw_value
         return DollarItem(
             value=item_value,
@@ -319,12 +894,12 @@ class DollarListWriter:
         """
         Create a DollarItem from a negative integer
         """
-        raw_value = item.to_bytes((item.bit_length() + 7) // 8, "little",signed=True)
+        raw_value = item.to_bytes(((~item).bit_length() + 8) // 8, "little",signed=True)
         item_value = item
         lenght = self.get_meta_value_length(raw_value)
-        buffer = lenght + Dollartype.ITEM_NEGINT.value.to_bytes(1, "little") + raw_value
+        buffer = lenght + _ITEM_NEGINT.to_bytes(1, "little") + raw_value
         return DollarItem(
-            dollar_type=Dollartype.ITEM_NEGINT.value,
+            dollar_type=_ITEM_NEGINT,
             value=item_value,
             raw_value=raw_value,
             buffer=buffer
@@ -337,9 +912,9 @@ class DollarListWriter:
         raw_value = item.to_bytes((item.bit_length() + 7) // 8, "little")
         item_value = item
         lenght = self.get_meta_value_length(raw_value)
-        buffer = lenght + Dollartype.ITEM_POSINT.value.to_bytes(1, "little") + raw_value
+        buffer = lenght + _ITEM_POSINT.to_bytes(1, "little") + raw_value
         return DollarItem(
-            dollar_type=Dollartype.ITEM_POSINT.value,
+            dollar_type=_ITEM_POSINT,
             value=item_value,
             raw_value=raw_value,
             buffer=buffer
@@ -348,34 +923,63 @@ class DollarListWriter:
     def create_from_float(self,item):
         """
         Create a DollarItem from a float
+        A float that can't be a decimal number with a scale of one byte,
+        like 5e-324, inf or nan, is stored as a double
         """
         rsp = None
-        if item < 0:
+        if not math.isfinite(item):
+            rsp = self.create_double(item)
+        elif not -128 <= self.get_num_scale(item)[1] <= 127:
+            rsp = self.create_double(item)
+        elif item < 0:
             rsp = self.create_negnum(item)
         else:
             rsp = self.create_posnum(item)
         return rsp
 
+    @staticmethod
+    def get_num_scale(item):
+        """
+        Return the integer and the scale of a float, item = num * 10 ** scale
+        They come from the shortest repr of the float, which reads back
+        to the same float: 1.2345 -> 12345 with scale -4, 1e+22 -> 1 with scale 22
+        """
+        mantissa, _, exponent = repr(abs(item)).partition('e')
+        whole, _, fraction = mantissa.partition('.')
+        num = int(whole + fraction)
+        scale = int(exponent or 0) - len(fraction)
+        if item < 0:
+            num = -num
+        return num, scale
+
+    def create_double(self,item):
+        """
+        Create a DollarItem from a float, stored as an IEEE double
+        """
+        raw_value = struct.pack('<d',item)
+        return DollarItem(
+            dollar_type=_ITEM_DOUBLE,
+            value=item,
+            raw_value=raw_value,
+            buffer=b'\x0a\x08' + raw_value
+        )
+
     def create_negnum(self,item):
         """
         Create a DollarItem from a negative float
         """
-        # convert the float to a positive interger with a scale
-        # 1.2345 -> 12345 with scale 4
-
-        # get the scale
-        scale = len(str(item).split('.')[1]) * -1
-        # convert to int
-        num = int(item * (10 ** (scale * -1)))
+        # convert the float to an interger with a scale
+        # 1.2345 -> 12345 with scale -4
+        num, scale = self.get_num_scale(item)
         # create the item
         raw_value = (scale.to_bytes(1, "little",signed=True)
-                    +num.to_bytes((num.bit_length() + 7) // 8, "little",signed=True))
+                    +num.to_bytes(((~num).bit_length() + 8) // 8, "little",signed=True))
 
         item_value = item
         lenght = self.get_meta_value_length(raw_value)
-        buffer = lenght + Dollartype.ITEM_NEGNUM.value.to_bytes(1, "little") + raw_value
+        buffer = lenght + _ITEM_NEGNUM.to_bytes(1, "little") + raw_value
         return DollarItem(
-            dollar_type=Dollartype.ITEM_NEGNUM.value,
+            dollar_type=_ITEM_NEGNUM,
             value=item_value,
             raw_value=raw_value,
             buffer=buffer
@@ -385,28 +989,94 @@ class DollarListWriter:
         """
         Create a DollarItem from a positive float
         """
-        # convert the float to a positive interger with a scale
-        # 1.2345 -> 12345 with scale 4
-
-        # get the scale
-        scale = len(str(item).split('.')[1]) * -1
-        # convert to int
-        num = int(item * (10 ** (scale * -1)))
+        # convert the float to an interger with a scale
+        # 1.2345 -> 12345 with scale -4
+        num, scale = self.get_num_scale(item)
         # create the item
         raw_value = (scale.to_bytes(1, "little",signed=True)
                     +num.to_bytes((num.bit_length() + 7) // 8, "little"))
 
         item_value = item
         lenght = self.get_meta_value_length(raw_value)
-        buffer = lenght + Dollartype.ITEM_POSNUM.value.to_bytes(1, "little") + raw_value
+        buffer = lenght + _ITEM_POSNUM.to_bytes(1, "little") + raw_value
         return DollarItem(
-            dollar_type=Dollartype.ITEM_POSNUM.value,
+            dollar_type=_ITEM_POSNUM,
             value=item_value,
             raw_value=raw_value,
             buffer=buffer
         )
 
-    def get_meta_value_length(self,raw_value):
+    @staticmethod
+    def pack_ints(values):
+        """
+        Encode a sequence of int, and not of a subclass, to $list bytes
+        in one loop, without creating the DollarItems.
+        The bytes are the same as the bytes of create_from_int.
+        """
+        out = bytearray()
+        for value in values:
+            if value >= 0:
+                length = (value.bit_length() + 7) >> 3
+                if length < 254:
+                    out += _POSINT_HEADERS[length]
+                else:
+                    out += DollarListWriter.get_meta_value_length(bytes(length))
+                    out += b'\x04'
+                out += value.to_bytes(length, "little")
+            else:
+                length = ((~value).bit_length() + 8) >> 3
+                if length < 254:
+                    out += _NEGINT_HEADERS[length]
+                else:
+                    out += DollarListWriter.get_meta_value_length(bytes(length))
+                    out += b'\x05'
+                out += value.to_bytes(length, "little", signed=True)
+        return bytes(out)
+
+    @staticmethod
+    def pack_floats(values):
+        """
+        Encode a sequence of float, and not of a subclass, to $list bytes
+        in one loop, without creating the DollarItems.
+        The bytes are the same as the bytes of create_from_float: a decimal
+        number from the shortest repr, or a double for inf, nan and
+        the scales out of one byte.
+        The repr() and the int() of each value, that the decimal form needs,
+        take most of the time, a float is several times slower to pack than
+        an int.
+        """
+        out = bytearray()
+        pack_double = _DOUBLE.pack
+        for value in values:
+            # like get_num_scale, the sign is kept in the whole part
+            mantissa, _, exponent = repr(value).partition('e')
+            whole, _, fraction = mantissa.partition('.')
+            if not fraction and not exponent:
+                # inf or nan
+                out += b'\x0a\x08'
+                out += pack_double(value)
+                continue
+            scale = (int(exponent) if exponent else 0) - len(fraction)
+            if not -128 <= scale <= 127:
+                out += b'\x0a\x08'
+                out += pack_double(value)
+                continue
+            num = int(whole + fraction)
+            # -0.0 is a positive number, like in create_from_float
+            if value < 0:
+                length = ((~num).bit_length() + 8) >> 3
+                out += _NEGNUM_HEADERS[length + 1]
+                out += _SCALES[scale + 128]
+                out += num.to_bytes(length, "little", signed=True)
+            else:
+                length = (num.bit_length() + 7) >> 3
+                out += _POSNUM_HEADERS[length + 1]
+                out += _SCALES[scale + 128]
+                out += num.to_bytes(length, "little")
+        return bytes(out)
+
+    @staticmethod
+    def get_meta_value_length(raw_value):
         """
         Get the length of the raw value
         """
@@ -425,34 +1095,375 @@ class DollarListWriter:
             raise DollarListException("Value is too long")
         return response
 
-class DollarList:
+# encoders by python type, function(writer, value) -> DollarItem
+_ENCODERS = {
+    DollarItem: lambda writer, item: item,
+    str: DollarListWriter.create_from_string,
+    type(None): DollarListWriter.create_from_string,
+    bool: DollarListWriter.create_from_bool,
+    int: DollarListWriter.create_from_int,
+    float: DollarListWriter.create_from_float,
+    bytes: DollarListWriter.create_from_bytes,
+    bytearray: DollarListWriter.create_from_bytes,
+}
+# encoders of the types of modules that are not imported by the package,
+# by (module, name), to not import the module before it is used
+_LAZY_ENCODERS = {
+    ('decimal', 'Decimal'): DollarListWriter.create_from_decimal,
+}
+# encoder of each python type met, including the subclasses of registered types
+# read without lock, filled and cleared under _REGISTRY_LOCK
+_ENCODER_CACHE = {}
+# a threading.Lock, see the imports
+_REGISTRY_LOCK = allocate_lock()
+
+def _find_encoder(python_type):
+    """
+    Find the encoder of the closest registered base class and cache it
+    """
+    with _REGISTRY_LOCK:
+        for base in python_type.__mro__:
+            encoder = _ENCODERS.get(base)
+            if encoder is None:
+                encoder = _LAZY_ENCODERS.get((base.__module__, base.__qualname__))
+            if encoder is not None:
+                _ENCODER_CACHE[python_type] = encoder
+                return encoder
+    raise DollarListException("Invalid item type")
+
+def register_encoder(python_type, encoder):
+    """
+    Register how to encode the instances of python_type and of its subclasses.
+    encoder(value) returns a DollarItem, or any value that can be encoded,
+    like a str, an int, a DollarList or another registered type.
+    """
+    with _REGISTRY_LOCK:
+        _ENCODERS[python_type] = lambda writer, value: writer.convert_item(encoder(value))
+        _ENCODER_CACHE.clear()
+
+def unregister_encoder(python_type):
+    """
+    Remove the encoder registered for python_type, the encoder of a type
+    supported by default, like float, is restored.
+    Nothing is done if no encoder was registered for python_type.
+    """
+    with _REGISTRY_LOCK:
+        if python_type in _DEFAULT_ENCODERS:
+            _ENCODERS[python_type] = _DEFAULT_ENCODERS[python_type]
+        else:
+            _ENCODERS.pop(python_type, None)
+        _ENCODER_CACHE.clear()
+
+def register_decoder(dollar_type, decoder):
+    """
+    Register how to decode the raw value of an item type other than ascii.
+    decoder(raw_value) returns the value of the item.
+    """
+    if not isinstance(dollar_type, int):
+        # a Dollartype
+        dollar_type = dollar_type.value
+    if dollar_type in (_ITEM_ASCII, _ITEM_PLACEHOLDER):
+        raise DollarListException("Ascii values and sub-lists can't be overridden")
+    with _REGISTRY_LOCK:
+        SCALAR_DECODERS[dollar_type] = decoder
+
+def loads(buffer,max_depth=None,limits=None,usage=None):
+    """
+    Decode a $list buffer to a python list, nested lists become lists
+    limits is a DollarListLimits, usage a DollarListUsage to fill
+    Nothing is shared between calls, it is safe to call from many threads
+    """
+    return DollarList.from_bytes(buffer,max_depth,limits,usage).to_list()
+
+def dumps(values):
+    """
+    Encode a python list to $list bytes, nested lists and tuples become
+    nested $list
+    Nothing is shared between calls, it is safe to call from many threads
+    A list of int only, or of float only, is packed in one loop
+    """
+    values = list(values)
+    pack = _find_packer(values)
+    if pack is not None:
+        return pack(values)
+    return DollarList.from_list(values).to_bytes()
+
+def _find_packer(values):
+    """
+    Return pack_ints or pack_floats if values is a list of int only,
+    or of float only, encoded by the default encoder, else None
+    """
+    if not values or _stats is not None:
+        return None
+    types = set(map(type, values))
+    if len(types) != 1:
+        return None
+    python_type = types.pop()
+    # unless another encoder was registered
+    if python_type is int and _ENCODERS[int] is DollarListWriter.create_from_int:
+        return DollarListWriter.pack_ints
+    if python_type is float and _ENCODERS[float] is DollarListWriter.create_from_float:
+        return DollarListWriter.pack_floats
+    return None
+
+def _quote(text):
+    """
+    Return a string as the item of a $lb(...) text, the quotes are escaped
+    as "" and the control characters, like a new line, are written as
+    $c(10) joined to the rest by _, like ZWRITE does, the text is one line.
+    bytes, the ascii values that are not text, are written as latin-1,
+    one character per byte
+    """
+    if not isinstance(text, str):
+        text = text.decode('latin-1') if isinstance(text, (bytes, bytearray)) else str(text)
+    if '"' in text:
+        text = text.replace('"', '""')
+    if text.isprintable():
+        return '"' + text + '"'
+    # quoted parts and lists of character codes
+    terms = []
+    start = 0
+    for index, char in enumerate(text):
+        if char < ' ' or char == '\x7f':
+            if index > start:
+                terms.append('"' + text[start:index] + '"')
+            if terms and isinstance(terms[-1], list):
+                terms[-1].append(str(ord(char)))
+            else:
+                terms.append([str(ord(char))])
+            start = index + 1
+    if start < len(text):
+        terms.append('"' + text[start:] + '"')
+    return '_'.join(term if isinstance(term, str) else '$c(' + ','.join(term) + ')'
+                    for term in terms)
+
+class DollarItems(list):
+    """
+    The items of a DollarList, a list that invalidates its DollarList
+    when it is changed in place, like lst.items.append(item)
+    """
+    __slots__ = ('_owner',)
+
+    def __init__(self, items=(), owner=None):
+        list.__init__(self, items)
+        # weak, the DollarList holds its items
+        self._owner = None if owner is None else weakref.ref(owner)
+
+    def _changed(self, items=()):
+        owner = self._owner() if self._owner is not None else None
+        if owner is not None:
+            for item in items:
+                owner.adopt(item)
+            owner.invalidate()
+
+    def append(self, item):
+        super().append(item)
+        self._changed((item,))
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._changed((item,))
+
+    def extend(self, items):
+        items = list(items)
+        super().extend(items)
+        self._changed(items)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __imul__(self, count):
+        result = super().__imul__(count)
+        self._changed()
+        return result
+
+    def __setitem__(self, index, item):
+        if isinstance(index, slice):
+            item = list(item)
+            super().__setitem__(index, item)
+            self._changed(item)
+        else:
+            super().__setitem__(index, item)
+            self._changed((item,))
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *, key=None, reverse=False):
+        super().sort(key=key, reverse=reverse)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
 
-    items: List[DollarItem] = []
+class DollarList: # pylint: disable=too-many-public-methods
 
     def __init__(self, value=None):
+        # each list owns its items, they are never shared between instances,
+        # a plain list until the items property wraps it in DollarItems
+        self._items = []
+        # memoized result of to_bytes(), None when the items changed
+        self._buffer = None
+        # lists holding this list as an item, id -> weak reference
+        self._parents = {}
+        # ids of the nested lists changed since the last to_bytes()
+        self._stale = set()
         if value is not None:
             if isinstance(value, bytes):
-                for item in self.from_bytes(value):
-                    self.items.append(item)
+                self._items.extend(self.from_bytes(value))
             elif isinstance(value, list):
-                for item in self.from_list(value):
-                    self.items.append(item)
+                self._items.extend(self.from_list(value))
             elif isinstance(value, str):
-                for item in self.from_string(value):
-                    self.items.append(item)
+                self._items.extend(self.from_string(value))
             elif isinstance(value, DollarList):
-                for item in value.items:
-                    self.items.append(item)
+                self._items.extend(value)
             else:
                 raise DollarListException("Invalid value type")
+            for item in self._items:
+                self.adopt(item)
+
+    @property
+    def items(self):
+        """
+        The DollarItems of the list, changing them in place invalidates the list
+        """
+        items = self._items
+        if items.__class__ is not DollarItems:
+            items = self._items = DollarItems(items, self)
+        return items
+
+    @items.setter
+    def items(self, items):
+        self.set_items(items)
+
+    def set_items(self, items, buffer=None):
+        """
+        Replace the items of the list.
+        buffer, if given, is the encoding of the items, returned by to_bytes()
+        until the list is changed
+        """
+        # a copy of the items of another list, or of an iterable
+        self._items = items if items.__class__ is list else list(items)
+        self._stale.clear()
+        for item in self._items:
+            if item.dollar_type == _ITEM_PLACEHOLDER:
+                self.adopt(item)
+        if buffer is None:
+            self.invalidate()
         else:
-            self.items = []
+            self._buffer = buffer
 
     def append(self,item):
         """
         Append a new item to the list
         """
-        self.items.append(DollarListWriter().create_dollar_item(item))
+        item = DollarListWriter().create_dollar_item(item)
+        self.adopt(item)
+        # without invalidating twice if the items are DollarItems
+        list.append(self._items, item)
+        self.invalidate()
+
+    def adopt(self, item):
+        """
+        Register this list as the parent of the nested list of item
+        """
+        if item.dollar_type == _ITEM_PLACEHOLDER and isinstance(item.value, DollarList):
+            item.value.add_parent(self)
+
+    def add_parent(self, parent):
+        """
+        Register parent as a list holding this list as an item,
+        parent is invalidated with this list
+        """
+        self._parents[id(parent)] = weakref.ref(parent)
+
+    def parents(self):
+        """
+        Return the lists holding this list as an item
+        """
+        parents = []
+        for key, ref in list(self._parents.items()):
+            parent = ref()
+            if parent is None:
+                del self._parents[key]
+            else:
+                parents.append(parent)
+        return parents
+
+    def invalidate(self):
+        """
+        Mark the list as changed, changing the items does it.
+        Call it after changing an item in place, like its value.
+        The memoized bytes are dropped and each parent list will re-encode
+        the item of this list, and only this one, on its next to_bytes()
+        """
+        self._buffer = None
+        stack = [self]
+        while stack:
+            child = stack.pop()
+            for parent in child.parents():
+                # a parent already marked has already marked its own parents
+                if parent.mark_stale(child):
+                    stack.append(parent)
+
+    def mark_stale(self, child):
+        """
+        Mark the nested list child as changed since the last to_bytes(),
+        return False if it was already marked
+        """
+        if id(child) in self._stale:
+            return False
+        self._stale.add(id(child))
+        self._buffer = None
+        return True
+
+    def stale_lists(self):
+        """
+        Return the nested lists to re-encode before this list,
+        the ones changed since the last to_bytes()
+        """
+        stale = self._stale
+        if not stale or self._buffer is not None:
+            return []
+        return [item.value for item in self._items
+                if item.dollar_type == _ITEM_PLACEHOLDER
+                and id(item.value) in stale]
+
+    def encode_items(self):
+        """
+        Re-encode the changed nested lists, their own bytes are up to date,
+        and join the items, to_bytes() calls it the deepest lists first
+        """
+        if self._buffer is not None:
+            return
+        items = self._items
+        if self._stale:
+            stale = self._stale
+            writer = DollarListWriter()
+            for index, item in enumerate(items):
+                if item.dollar_type == _ITEM_PLACEHOLDER and id(item.value) in stale:
+                    # a new item, the old one may be shared with another list,
+                    # set without invalidating this list again
+                    list.__setitem__(items, index,
+                                     writer.create_from_dollar_list(item.value))
+            stale.clear()
+        self._buffer = b''.join([item.buffer for item in items])
 
     @staticmethod
     def from_string(string):
@@ -467,56 +1478,151 @@ class DollarList:
         A list can be nested
         Parse the string item by item. Move in the string until the next ',' or ')'
         """
-        def parse_list(string):
-            count = 0
-            for i,value in enumerate(string):
-                if string[i:i+4] == '$lb(':
-                    count += 1
-                elif value == ')':
-                    count -= 1
-                if count == 0:
-                    item = DollarList.from_string(string[0:i+1])
-                    return item,string[i+2:]
-            raise DollarListException("Invalid string")
-
-        def parse_item(string):
-            for i,value in enumerate(string):
-                if value in (',' , ')'):
-                    if string[0] == '"':
-                        item = DollarListWriter().create_dollar_item(string[1:i-1])
-                    else:
-                        item = DollarListWriter().create_dollar_item(int(string[0:i]))
-                    return item,string[i+1:]
-            raise DollarListException("Invalid string")
+        stats = _stats
+        if stats is None:
+            return DollarList.parse_string(string)
+        start = stats.begin('parse')
+        try:
+            return DollarList.parse_string(string)
+        finally:
+            stats.end('parse', start, len(string))
 
-        if string[0:3] != '$lb':
-            raise DollarListException("Invalid string format")
-        string = string[3:]
-        if string[0] != '(':
+    @staticmethod
+    def parse_string(string): # pylint: disable=too-many-branches
+        """
+        Parse a string in the format of $lb(...) to a DollarList
+        The string is read once, nested lists are parsed with an explicit
+        stack, not by recursion.
+        - "..." is a string, "" in it is an escaped quote
+        - $c(10) is a string of characters given by their codes,
+          strings are joined by _, like "a"_$c(13,10)_"b"
+        - $lb(...) is a nested list
+        - an empty item, like in $lb(1,,2), is null
+        - anything else is an int or a float, like -3, 1.5, .5 or 1e+22
+        """
+        if not string.startswith('$lb('):
             raise DollarListException("Invalid string format")
-        string = string[1:]
-        response = DollarList()
-        while len(string) > 0:
-            if string[0] == '$':
-                # list
-                item, string = parse_list(string)
-                response.append(item)
+        # the lists being parsed, the innermost last
+        lists = [DollarList()]
+        pos = 4
+        while True:
+            # an item starts at pos
+            char = string[pos:pos+1]
+            if char == '"' or string.startswith('$c(', pos):
+                text, pos = DollarList.parse_text(string, pos)
+                lists[-1].append(text)
+            elif string.startswith('$lb(', pos):
+                lists.append(DollarList())
+                pos += 4
+                continue
+            elif char in (',', ')'):
+                lists[-1].append(None)
             else:
-                # item
-                item, string = parse_item(string)
-                response.append(item)
-        return response
+                stop = string.find(',', pos)
+                close = string.find(')', pos)
+                if stop < 0 or 0 <= close < stop:
+                    stop = close
+                if stop < 0:
+                    raise DollarListException("Invalid string, missing )")
+                lists[-1].append(DollarList.parse_number(string[pos:stop]))
+                pos = stop
+            # after an item, a ',' or the ')' of one or more lists
+            while True:
+                char = string[pos:pos+1]
+                pos += 1
+                if char == ',':
+                    break
+                if char != ')':
+                    raise DollarListException(f"Invalid string at {pos - 1}")
+                dollar_list = lists.pop()
+                if not lists:
+                    if pos != len(string):
+                        raise DollarListException(f"Invalid string at {pos}")
+                    return dollar_list
+                lists[-1].append(dollar_list)
+
+    @staticmethod
+    def parse_text(string, pos):
+        """
+        Parse the string item of a $lb(...) string starting at pos,
+        "..." and $c(...) joined by _,
+        return the string and the position after it
+        """
+        parts = []
+        while True:
+            if string.startswith('"', pos):
+                stop = pos + 1
+                while True:
+                    stop = string.find('"', stop)
+                    if stop < 0:
+                        raise DollarListException("Invalid string, missing quote")
+                    if string[stop+1:stop+2] != '"':
+                        break
+                    stop += 2
+                parts.append(string[pos+1:stop].replace('""', '"'))
+            elif string.startswith('$c(', pos):
+                stop = string.find(')', pos)
+                if stop < 0:
+                    raise DollarListException("Invalid string, missing )")
+                try:
+                    parts.append(''.join(chr(int(code))
+                                         for code in string[pos+3:stop].split(',')))
+                except (ValueError, OverflowError):
+                    raise DollarListException(f"Invalid character code at {pos}") from None
+            else:
+                raise DollarListException(f"Invalid string at {pos}")
+            pos = stop + 1
+            if not string.startswith('_', pos):
+                return ''.join(parts), pos
+            pos += 1
+
+    @staticmethod
+    def parse_number(string):
+        """
+        Parse a number of a $lb(...) string to an int or a float
+        """
+        try:
+            return int(string)
+        except ValueError:
+            pass
+        try:
+            return float(string)
+        except ValueError:
+            raise DollarListException(f"Invalid number {string!r}") from None
 
     def __len__(self):
-        return len(self.items)
+        return len(self._items)
 
     def to_bytes(self):
         """
         Convert a DollarList to bytes
+        The result is memoized until the list, or one of its nested lists,
+        is changed by append, __setitem__ or __delitem__.
+        Only the changed nested lists are re-encoded, the bytes of the
+        others are reused.
         """
-        buffer = b''
-        for item in self.items:
-            buffer += item.buffer
+        if self._buffer is None:
+            # changed nested lists in post-order, the deepest first,
+            # with an explicit stack
+            order = []
+            seen = {id(self)}
+            stack = [(self, iter(self.stale_lists()))]
+            while stack:
+                dollar_list, stale_lists = stack[-1]
+                for child in stale_lists:
+                    if id(child) not in seen:
+                        seen.add(id(child))
+                        stack.append((child, iter(child.stale_lists())))
+                        break
+                else:
+                    stack.pop()
+                    order.append(dollar_list)
+            for dollar_list in order:
+                dollar_list.encode_items()
+        buffer = self._buffer
+        # a decoded nested list holds a view of the decoded buffer
+        if buffer.__class__ is memoryview:
+            buffer = self._buffer = buffer.tobytes()
         return buffer
 
     @staticmethod
@@ -524,23 +1630,76 @@ class DollarList:
         """
         Create a DollarListWriter from a python list
         For each item in the list, create a DollarItem
+        Nested lists and tuples are encoded with an explicit stack,
+        not by recursion, the deepest first
+        A list of int only, or of float only, is packed in one loop like dumps
+        does, its items are slices of the packed bytes
         """
+        if not isinstance(python_list, list):
+            raise DollarListException("Invalid input type")
+        pack = _find_packer(python_list)
+        if pack is not None:
+            dollar_list = DollarList._from_packed(python_list, pack(python_list))
+            if dollar_list is not None:
+                return dollar_list
+        # like append, with one writer and without invalidating
+        # the new list at each item
+        create = DollarListWriter().create_dollar_item
         dollar_list = DollarList()
-        if isinstance(python_list, list):
-            if len(python_list) > 0:
-                for item in python_list:
-                    dollar_list.append(item)
+        # values left, items and DollarList of each open list
+        stack = [(iter(python_list), [], dollar_list)]
+        while stack:
+            values, items, current = stack[-1]
+            for value in values:
+                encoder = _ENCODER_CACHE.get(type(value))
+                if encoder is None:
+                    encoder = _find_encoder(type(value))
+                if encoder is _encode_list:
+                    stack.append((iter(value), [], DollarList()))
+                    break
+                items.append(create(value))
             else:
-                dollar_list.append(None)
-        else:
-            raise DollarListException("Invalid input type")
+                stack.pop()
+                # an empty list holds one empty item
+                current.set_items(items or [create(None)])
+                if stack:
+                    stack[-1][1].append(create(current))
+        return dollar_list
+
+    @staticmethod
+    def _from_packed(values, buffer):
+        """
+        Create a DollarList of the values packed in buffer by pack_ints
+        or pack_floats, the items are the ones of the writer without
+        encoding each value again.
+        Return None if an item has a header longer than 2 bytes, a huge int
+        """
+        items = []
+        offset = 0
+        for value in values:
+            stop = offset + buffer[offset]
+            if stop == offset:
+                return None
+            items.append(DollarItem(buffer[offset + 1], value=value,
+                                    raw_value=buffer[offset + 2:stop],
+                                    buffer=buffer[offset:stop]))
+            offset = stop
+        dollar_list = DollarList()
+        dollar_list.set_items(items, buffer)
         return dollar_list
 
     # add to the dataclass a new constructor from_bytes
     @staticmethod
-    def from_bytes(buffer:bytes):
+    def from_bytes(buffer:bytes,max_depth=None,limits=None,usage=None):
+        """
+        Create a DollarList from bytes
+        Nested lists deeper than max_depth raise a DollarListException
+        limits is a DollarListLimits, a buffer over a limit raises
+        a DollarListException before the items are created.
+        usage is a DollarListUsage filled with what the decode allocated.
+        """
         cls = DollarList()
-        cls.items = DollarListReader(buffer).items
+        decode_items(buffer,max_depth,cls,limits,usage)
         return cls
 
     def __str__(self):
@@ -548,85 +1707,218 @@ class DollarList:
         Return a string representation of the list.
         Like the dollar list representation with $lb
         """
-        return self._str_(self.items)
+        blocks = []
+        self._write_str(self._items, blocks.append)
+        return blocks[0] if len(blocks) == 1 else "".join(blocks)
+
+    def to_string(self, max_length=None):
+        """
+        Return the $lb(...) representation of the list, like str().
+        If max_length is given, a longer text is cut after max_length
+        characters and ends with "...", the rest of the list is not formatted.
+        """
+        blocks = []
+        self._write_str(self._items, blocks.append, max_length, _STR_BLOCK_PARTS)
+        return "".join(blocks)
+
+    def write_string(self, file, max_length=None):
+        """
+        Write the $lb(...) representation of the list to a text file,
+        by blocks, without building the whole text in memory.
+        max_length is like in to_string.
+        Return the number of characters written.
+        """
+        return self._write_str(self._items, file.write, max_length, _STR_BLOCK_PARTS)
 
     @classmethod
-    def _str_(cls,items):
+    def _write_str(cls,items,write,max_length=None,block_parts=0): # pylint: disable=too-many-branches
         """
-        Return a string representation of the list.
-        Like the dollar list representation with $lb"""
-        response = "$lb("
-        for item in items:
-
-            if item.dollar_type in (Dollartype.ITEM_ASCII.value,
-                                    Dollartype.ITEM_UNICODE.value):
-                if item.value is None:
-                    response += '""' # way of iris to represent null string
+        Format the items like the dollar list representation with $lb,
+        the quotes of the strings are escaped as "" and the control
+        characters are written as $c(...), bytes are written as latin-1.
+        The text is passed to write by blocks of block_parts parts,
+        in one block if 0, and cut after max_length characters if given.
+        Nested lists are formatted with an explicit stack, not by recursion
+        Return the number of characters written.
+        """
+        written = 0
+        parts = ["$lb("]
+        append = parts.append
+        if len(items) == 0:
+            append('""')
+        # iterator over the items of each open list and if it is the first item
+        stack = [[iter(items), True]]
+        while stack:
+            frame = stack[-1]
+            for item in frame[0]:
+                if frame[1]:
+                    frame[1] = False
                 else:
-                    response += f'"{item.value}"'
-
-            elif item.dollar_type == Dollartype.ITEM_PLACEHOLDER.value:
-                response += cls._str_(item.value.items)
+                    append(",")
+                typ = item.dollar_type
+                if typ in (_ITEM_ASCII, _ITEM_UNICODE):
+                    value = item.value
+                    if value is None:
+                        append('""') # way of iris to represent null string
+                    elif isinstance(value, str) and ('"' not in value and value.isprintable()):
+                        # nothing to escape
+                        append(f'"{value}"')
+                    else:
+                        append(_quote(value))
+                elif typ == _ITEM_PLACEHOLDER:
+                    append("$lb(")
+                    if len(item.value) == 0:
+                        append('""')
+                    stack.append([iter(item.value), True])
+                    break
+                else:
+                    append(f'{item.value}')
+                if block_parts and len(parts) > block_parts:
+                    block = "".join(parts)
+                    parts.clear()
+                    if max_length is not None and written + len(block) > max_length:
+                        block = block[:max_length - written] + "..."
+                        write(block)
+                        return written + len(block)
+                    write(block)
+                    written += len(block)
             else:
-                response += f'{item.value}'
-            response += ","
-        if len(items) > 0:
-            response = response[:-1]
-        if len(items) == 0:
-            response += '""'
-        response += ")"
-        return response
+                append(")")
+                stack.pop()
+        block = "".join(parts)
+        if max_length is not None and written + len(block) > max_length:
+            block = block[:max_length - written] + "..."
+        write(block)
+        return written + len(block)
 
     @classmethod
     def _to_list(cls,items):
         """
         Convert a list of DollarItems to a list of python objects
+        Nested lists are converted with an explicit stack, not by recursion
         """
         response = []
-        for item in items:
-            if item.dollar_type == 0:
-                response.append(cls._to_list(item.value))
+        # iterator over the items of each open list and the python list to fill
+        stack = [(iter(items), response)]
+        while stack:
+            iterator, values = stack[-1]
+            for item in iterator:
+                if item.dollar_type == 0:
+                    sub_values = []
+                    values.append(sub_values)
+                    stack.append((iter(item.value), sub_values))
+                    break
+                values.append(item.value)
             else:
-                response.append(item.value)
+                stack.pop()
         return response
 
     def to_list(self):
         """
         Convert a list of DollarItems to a list of python objects
         """
-        return self._to_list(self.items)
+        return self._to_list(self._items)
 
     # build iterator for values
     def __iter__(self):
-        return iter(self.items)
+        if self._stale:
+            self.to_bytes()
+        return iter(self._items)
 
     def __getitem__(self, index):
-        return self.items[index]
+        # the items of the changed nested lists are re-encoded first
+        if self._stale:
+            self.to_bytes()
+        return self._items[index]
 
     def __setitem__(self, index, value):
-        self.items[index] = DollarListWriter().create_dollar_item(value)
+        item = DollarListWriter().create_dollar_item(value)
+        self.adopt(item)
+        list.__setitem__(self._items, index, item)
+        self.invalidate()
 
     def __delitem__(self, index):
-        del self.items[index]
+        list.__delitem__(self._items, index)
+        self.invalidate()
+
+    @staticmethod
+    def _item_buffer(value):
+        """
+        Return the encoded item of a value, None if it can't be encoded
+        """
+        try:
+            return DollarListWriter().create_dollar_item(value).buffer
+        except DollarListException:
+            return None
 
     def __contains__(self, item):
-        return DollarListWriter().create_dollar_item(item) in self.items
+        # compare the encoded items, nothing is decoded
+        needle = self._item_buffer(item)
+        if self._stale:
+            self.to_bytes()
+        return needle is not None and needle in [item.buffer for item in self._items]
+
+    def index(self, value, start=0, stop=None):
+        """
+        Return the index of the first item equal to value,
+        comparing the encoded items
+        Raise ValueError if the value is not present
+        """
+        needle = self._item_buffer(value)
+        if self._stale:
+            self.to_bytes()
+        buffers = [item.buffer for item in self._items]
+        if needle is None:
+            raise ValueError(f"{value!r} is not in DollarList")
+        if stop is None:
+            stop = len(buffers)
+        try:
+            return buffers.index(needle, start, stop)
+        except ValueError:
+            raise ValueError(f"{value!r} is not in DollarList") from None
+
+    def count(self, value):
+        """
+        Return the number of items equal to value, comparing the encoded items
+        """
+        needle = self._item_buffer(value)
+        if needle is None:
+            return 0
+        if self._stale:
+            self.to_bytes()
+        return [item.buffer for item in self._items].count(needle)
 
     def __eq__(self, other):
-        return self.items == other.items
+        # two lists are equal if their encoded forms are equal
+        if not isinstance(other, DollarList):
+            return NotImplemented
+        return self.to_bytes() == other.to_bytes()
 
     def __ne__(self, other):
-        return self.items != other.items
+        if not isinstance(other, DollarList):
+            return NotImplemented
+        return self.to_bytes() != other.to_bytes()
 
     def __add__(self, other):
-        result = self.items + other.items
+        result = self._items + list(other)
         return DollarList(result)
 
     def __repr__(self):
         return self.__str__()
 
     def __hash__(self):
-        return hash(self.items)
+        # the hash of the memoized bytes is itself cached by python
+        return hash(self.to_bytes())
 
     def __sizeof__(self):
-        return len(self.items)
+        return len(self._items)
+
+def _encode_list(writer, item):
+    # from_list encodes the nested lists without recursion
+    return writer.create_from_dollar_list(DollarList.from_list(list(item)))
+
+_ENCODERS[DollarList] = DollarListWriter.create_from_dollar_list
+_ENCODERS[list] = _encode_list
+_ENCODERS[tuple] = _encode_list
+# encoders of the types supported by default, restored by unregister_encoder
+_DEFAULT_ENCODERS = dict(_ENCODERS)
@@ -0,0 +1,18 @@
+# Module that covers the Dollartype enum of the item types
+# It is only imported on first use of Dollartype,
+# the codec uses the values of the enum
+#
+
+from enum import Enum
+
+class Dollartype(Enum):
+    ITEM_UNDEF = -1
+    ITEM_PLACEHOLDER = 0
+    ITEM_ASCII = 1
+    ITEM_UNICODE = 2
+    ITEM_POSINT = 4
+    ITEM_NEGINT = 5
+    ITEM_POSNUM = 6
+    ITEM_NEGNUM = 7
+    ITEM_DOUBLE = 8
+    ITEM_COMPACT_DOUBLE = 9
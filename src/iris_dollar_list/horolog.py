@@ -0,0 +1,44 @@
+# Module that covers the $HOROLOG dates of IRIS
+# A date is the number of days since 31/12/1840,
+# a $HOROLOG timestamp is the string "days,seconds"
+#
+
+from datetime import date, datetime, timedelta
+
+from .dollar_list import register_encoder
+
+HOROLOG_EPOCH = date(1840, 12, 31)
+
+def date_to_horolog(value):
+    """
+    Convert a date to the number of days of $HOROLOG
+    """
+    return (value - HOROLOG_EPOCH).days
+
+def datetime_to_horolog(value):
+    """
+    Convert a datetime to the "days,seconds" string of $HOROLOG
+    """
+    seconds = value.hour * 3600 + value.minute * 60 + value.second
+    return f'{date_to_horolog(value.date())},{seconds}'
+
+def horolog_to_date(value):
+    """
+    Convert the number of days of $HOROLOG to a date
+    """
+    return HOROLOG_EPOCH + timedelta(days=int(value))
+
+def horolog_to_datetime(value):
+    """
+    Convert the "days,seconds" string of $HOROLOG to a datetime
+    """
+    days, _, seconds = value.partition(',')
+    return datetime.combine(horolog_to_date(days), datetime.min.time()) + timedelta(
+        seconds=int(seconds or 0))
+
+def register_horolog():
+    """
+    Register the encoders of date and datetime as $HOROLOG
+    """
+    register_encoder(date, date_to_horolog)
+    register_encoder(datetime, datetime_to_horolog)
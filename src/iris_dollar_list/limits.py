@@ -0,0 +1,54 @@
+# Module that covers the limits of the decoding of untrusted buffers
+# DollarListLimits bounds what from_bytes, loads and validate accept,
+# DollarListUsage reports what a decode allocated
+#
+
+class DollarListLimits: # pylint: disable=too-few-public-methods
+    """
+    A class that represents the limits of a decode, None means no limit
+
+    max_items: number of items, including the items of the nested lists
+    max_depth: nesting depth, 1 for a list without nested list
+    max_item_size: length of the raw value of one item
+    max_bytes: bytes decoded, the length of the buffer plus the length of
+    each nested list, as the headers of each level are read
+
+    The headers are checked before any item is created, a decode over
+    a limit raises DollarListException.
+    """
+
+    def __init__(self, max_items=None, max_depth=None, max_item_size=None, max_bytes=None):
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.max_item_size = max_item_size
+        self.max_bytes = max_bytes
+
+    def __repr__(self):
+        return (f"DollarListLimits(max_items={self.max_items}, max_depth={self.max_depth}, "
+                f"max_item_size={self.max_item_size}, max_bytes={self.max_bytes})")
+
+class DollarListUsage:
+    """
+    A class that represents the resources allocated by a decode
+    """
+
+    def __init__(self):
+        # DollarItems created
+        self.items = 0
+        # DollarLists created for the nested lists
+        self.lists = 0
+        # nesting depth, 1 for a list without nested list
+        self.depth = 0
+        # bytes decoded, counted like DollarListLimits.max_bytes
+        self.bytes_decoded = 0
+        # bytes copied from the buffer to the raw value and the buffer of the items,
+        # the items holding a nested list are views of the buffer
+        self.bytes_allocated = 0
+
+    @property
+    def objects(self):
+        return self.items + self.lists
+
+    def __repr__(self):
+        return (f"DollarListUsage(items={self.items}, lists={self.lists}, depth={self.depth}, "
+                f"bytes_decoded={self.bytes_decoded}, bytes_allocated={self.bytes_allocated})")
@@ -0,0 +1,282 @@
+# Module that covers the schema-compiled codecs
+# DollarSchema declares a fixed record layout once, like
+# $lb(name ascii, count int, $lb(doubles...))
+# and compiles it to an encoder/decoder pair without runtime type detection
+#
+
+from collections import namedtuple
+from struct import Struct, error as StructError
+
+from .dollar_list import (DollarList, DollarListException, DollarListReader,
+                          DollarListWriter, read_item_header)
+from .dollartype import Dollartype
+
+DOUBLE = Struct('<d')
+COMPACT_DOUBLE = Struct('<f')
+
+NULL_ITEM = b'\x02\x01'
+
+ASCII = Dollartype.ITEM_ASCII.value
+UNICODE = Dollartype.ITEM_UNICODE.value
+POSINT = Dollartype.ITEM_POSINT.value
+NEGINT = Dollartype.ITEM_NEGINT.value
+POSNUM = Dollartype.ITEM_POSNUM.value
+NEGNUM = Dollartype.ITEM_NEGNUM.value
+ITEM_DOUBLE = Dollartype.ITEM_DOUBLE.value
+ITEM_COMPACT_DOUBLE = Dollartype.ITEM_COMPACT_DOUBLE.value
+
+# field type accepted for each Dollartype
+_DOLLARTYPE_FIELDS = {
+    Dollartype.ITEM_ASCII: 'ascii',
+    Dollartype.ITEM_UNICODE: 'unicode',
+    Dollartype.ITEM_POSINT: 'int',
+    Dollartype.ITEM_NEGINT: 'int',
+    Dollartype.ITEM_POSNUM: 'num',
+    Dollartype.ITEM_NEGNUM: 'num',
+    Dollartype.ITEM_DOUBLE: 'double',
+    Dollartype.ITEM_COMPACT_DOUBLE: 'compact_double',
+}
+
+def _item(typ, raw_value):
+    return DollarListWriter.get_meta_value_length(raw_value) + bytes((typ,)) + raw_value
+
+def _encode_ascii(value):
+    return _item(ASCII, value.encode('ascii'))
+
+def _encode_unicode(value):
+    return _item(UNICODE, value.encode('utf-16-le', 'surrogatepass'))
+
+def _encode_str(value):
+    return DollarListWriter().create_from_string(value).buffer
+
+def _encode_bytes(value):
+    return _item(ASCII, bytes(value))
+
+def _encode_int(value):
+    if value < 0:
+        return _item(NEGINT, value.to_bytes(((~value).bit_length() + 8) // 8, "little",signed=True))
+    return _item(POSINT, value.to_bytes((value.bit_length() + 7) // 8, "little"))
+
+def _encode_num(value):
+    if isinstance(value, int):
+        # without the rounding of float above 2**53, like dumps
+        return _encode_int(value)
+    return DollarListWriter().create_from_float(float(value)).buffer
+
+def _encode_double(value):
+    return b'\x0a\x08' + DOUBLE.pack(value)
+
+def _encode_compact_double(value):
+    return b'\x06\x09' + COMPACT_DOUBLE.pack(value)
+
+def _decode_str(typ, raw_value):
+    if typ == UNICODE:
+        return DollarListReader.get_unicode(raw_value)
+    return raw_value.decode('latin-1')
+
+def _decode_int(typ, raw_value):
+    return int.from_bytes(raw_value, "little", signed=typ == NEGINT)
+
+def _decode_num(typ, raw_value):
+    if typ in (POSINT, NEGINT):
+        # IRIS writes the integral numbers as int
+        return _decode_int(typ, raw_value)
+    if typ == POSNUM:
+        return DollarListReader.get_posnum(raw_value)
+    if typ == ITEM_DOUBLE:
+        # the floats that have no decimal form, like inf or 5e-324
+        return DOUBLE.unpack(raw_value)[0]
+    return DollarListReader.get_negnum(raw_value)
+
+# field type -> (python types, item types, encoder, decoder)
+FIELD_TYPES = {
+    'ascii': ((str,), (ASCII,), _encode_ascii,
+              lambda typ, raw_value: raw_value.decode('ascii')),
+    'unicode': ((str,), (UNICODE,), _encode_unicode,
+                lambda typ, raw_value: DollarListReader.get_unicode(raw_value)),
+    'str': ((str,), (ASCII, UNICODE), _encode_str, _decode_str),
+    'bytes': ((bytes, bytearray), (ASCII,), _encode_bytes,
+              lambda typ, raw_value: raw_value),
+    'int': ((int,), (POSINT, NEGINT), _encode_int, _decode_int),
+    'num': ((float, int), (POSNUM, NEGNUM, ITEM_DOUBLE, POSINT, NEGINT),
+            _encode_num, _decode_num),
+    'double': ((float, int), (ITEM_DOUBLE,), _encode_double,
+               lambda typ, raw_value: DOUBLE.unpack(raw_value)[0]),
+    'compact_double': ((float, int), (ITEM_COMPACT_DOUBLE,), _encode_compact_double,
+                       lambda typ, raw_value: COMPACT_DOUBLE.unpack(raw_value)[0]),
+}
+
+class DollarSchema: # pylint: disable=too-many-instance-attributes
+    """
+    A class that represents a fixed $list record layout
+
+    fields is a list of (name, type) tuples, or of types for unnamed fields
+    where type can be:
+    - a field type name of FIELD_TYPES: 'ascii', 'unicode', 'str', 'bytes',
+      'int', 'num', 'double', 'compact_double'
+    - a Dollartype
+    - a DollarSchema for a nested record
+    - a list of one type for a nested list of values of this type
+    Every field is nullable: None is encoded as the null item and a null item,
+    or a missing trailing field, is decoded as None.
+
+    output is the type of the decoded records: 'tuple', 'namedtuple' or 'dataclass'
+    validate checks the python type of each value on encode
+    and the number of items on decode, a value that can't be encoded
+    or decoded raises DollarListException
+    """
+
+    def __init__(self, fields, name='Record', output='tuple', validate=True):
+        self.name = name
+        self.output = output
+        self.validate = validate
+        self.names = []
+        self.types = []
+        for i, field in enumerate(fields):
+            if isinstance(field, tuple):
+                field_name, field_type = field
+            else:
+                field_name, field_type = f'f{i}', field
+            self.names.append(field_name)
+            self.types.append(field_type)
+        self.record_type = self._compile_record_type()
+        self._encoders = [self._compile_encoder(field_type) for field_type in self.types]
+        self._decoders = [self._compile_decoder(field_type) for field_type in self.types]
+
+    def encode(self, record):
+        """
+        Encode a record (sequence, dict or object with the field names
+        as attributes) to bytes
+        """
+        if isinstance(record, dict):
+            values = [record.get(name) for name in self.names]
+        elif isinstance(record, (tuple, list)):
+            values = record
+        else:
+            values = [getattr(record, name) for name in self.names]
+        if len(values) != len(self._encoders):
+            raise DollarListException(
+                f"Invalid record length {len(values)} for schema {self.name}"
+                )
+        return b''.join([
+            NULL_ITEM if value is None else encoder(value)
+            for encoder, value in zip(self._encoders, values)
+        ])
+
+    def decode(self, buffer):
+        """
+        Decode bytes (or a DollarList) to a record
+        """
+        if isinstance(buffer, DollarList):
+            buffer = buffer.to_bytes()
+        return self.record_type(self._decode_values(buffer))
+
+    def to_dollar_list(self, record):
+        """
+        Encode a record to a DollarList
+        """
+        return DollarList.from_bytes(self.encode(record))
+
+    def _decode_values(self, buffer):
+        values = []
+        offset = 0
+        size = len(buffer)
+        for decoder in self._decoders:
+            if offset >= size:
+                values.append(None)
+                continue
+            typ, start, offset = read_item_header(buffer, offset)
+            values.append(decoder(typ, buffer[start:offset]))
+        if self.validate and offset < size:
+            raise DollarListException(f"Too many items for schema {self.name}")
+        return values
+
+    def _compile_record_type(self):
+        if self.output == 'tuple':
+            return tuple
+        if self.output == 'namedtuple':
+            return namedtuple(self.name, self.names)._make
+        if self.output == 'dataclass':
+            # dataclasses is only needed for this output
+            from dataclasses import make_dataclass # pylint: disable=import-outside-toplevel
+            record_class = make_dataclass(self.name, self.names)
+            return lambda values: record_class(*values)
+        raise DollarListException(f"Invalid output {self.output}")
+
+    def _compile_encoder(self, field_type):
+        if isinstance(field_type, DollarSchema):
+            encode = field_type.encode
+            return lambda value: _item(ASCII, encode(value))
+        if isinstance(field_type, list):
+            encode = self._compile_encoder(field_type[0])
+            return lambda value: _item(ASCII, b''.join([
+                NULL_ITEM if item is None else encode(item) for item in value
+            ]))
+        python_types, _, encode, _ = self._field_type(field_type)
+        if not self.validate:
+            return encode
+        def encode_checked(value):
+            if not isinstance(value, python_types) or isinstance(value, bool):
+                raise DollarListException(
+                    f"Invalid value {value!r} for field type {field_type} of schema {self.name}"
+                    )
+            try:
+                return encode(value)
+            except (ValueError, OverflowError, StructError) as err:
+                # like a non ascii value of an ascii field
+                raise DollarListException(
+                    f"Invalid value {value!r} for field type {field_type} of schema {self.name}"
+                    ) from err
+        return encode_checked
+
+    def _compile_decoder(self, field_type):
+        if isinstance(field_type, DollarSchema):
+            decode_values = field_type._decode_values # pylint: disable=protected-access
+            record_type = field_type.record_type
+            item_types = (ASCII,)
+            def decode(typ, raw_value): # pylint: disable=unused-argument
+                return record_type(decode_values(raw_value))
+        elif isinstance(field_type, list):
+            decode_item = self._compile_decoder(field_type[0])
+            item_types = (ASCII,)
+            def decode(typ, raw_value): # pylint: disable=unused-argument
+                return _decode_list(raw_value, decode_item)
+        else:
+            _, item_types, _, decode = self._field_type(field_type)
+        validate = self.validate
+        def decode_checked(typ, raw_value):
+            if typ == ASCII and raw_value == b'':
+                return None
+            if typ not in item_types:
+                raise DollarListException(
+                    f"Invalid item type {typ} for field type {field_type} of schema {self.name}"
+                    )
+            if not validate:
+                return decode(typ, raw_value)
+            try:
+                return decode(typ, raw_value)
+            except (ValueError, StructError) as err:
+                # like a non ascii value of an ascii field or a double of 4 bytes
+                raise DollarListException(
+                    f"Invalid value for field type {field_type} of schema {self.name}: {err}"
+                    ) from err
+        return decode_checked
+
+    def _field_type(self, field_type):
+        if isinstance(field_type, Dollartype):
+            field_type = _DOLLARTYPE_FIELDS.get(field_type)
+        try:
+            return FIELD_TYPES[field_type]
+        except (KeyError, TypeError) as err:
+            raise DollarListException(
+                f"Invalid field type {field_type!r} for schema {self.name}"
+                ) from err
+
+def _decode_list(buffer, decode_item):
+    values = []
+    offset = 0
+    size = len(buffer)
+    while offset < size:
+        typ, start, offset = read_item_header(buffer, offset)
+        values.append(decode_item(typ, buffer[start:offset]))
+    return values
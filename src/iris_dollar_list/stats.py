@@ -0,0 +1,124 @@
+# Module that covers the instrumentation of the DollarList classes
+# DollarListStats is filled by DollarListReader, DollarListWriter
+# and DollarList.from_string once enabled with enable_stats()
+#
+
+import threading
+from time import perf_counter
+
+# phases timed by the instrumentation
+PHASES = ('decode', 'encode', 'parse')
+
+class DollarListStats: # pylint: disable=too-many-instance-attributes
+    """
+    A class that collects counters of the DollarList hot paths
+    The counters are updated under a lock and the nesting of the phases
+    is tracked per thread, so one instance can be shared by many threads
+    """
+
+    def __init__(self, callback=None):
+        # called with (phase, elapsed seconds, bytes) at the end of each
+        # outermost phase, to forward the measures to a metrics system
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """
+        Reset all the counters
+        """
+        # number of items decoded and encoded by item type
+        self.items_decoded = {}
+        self.items_encoded = {}
+        # number of decoded headers by header width (2, 4 or 8 bytes)
+        self.header_widths = {2: 0, 4: 0, 8: 0}
+        # sub-list parses tried by get_ascii and how many failed
+        self.sublist_attempts = 0
+        self.sublist_failures = 0
+        # cumulative time, number of calls and bytes by phase
+        self.phase_time = dict.fromkeys(PHASES, 0.0)
+        self.phase_calls = dict.fromkeys(PHASES, 0)
+        self.phase_bytes = dict.fromkeys(PHASES, 0)
+
+    def _depth(self):
+        """
+        Nesting level of each phase in the current thread,
+        only the outermost call is timed
+        """
+        depth = getattr(self._local, 'depth', None)
+        if depth is None:
+            depth = self._local.depth = dict.fromkeys(PHASES, 0)
+        return depth
+
+    @property
+    def bytes_decoded(self):
+        return self.phase_bytes['decode']
+
+    @property
+    def bytes_encoded(self):
+        return self.phase_bytes['encode']
+
+    def begin(self, phase):
+        """
+        Start a phase, return the start time to give back to end()
+        """
+        self._depth()[phase] += 1
+        return perf_counter()
+
+    def end(self, phase, start, nbytes=0):
+        """
+        End a phase started with begin()
+        """
+        depth = self._depth()
+        depth[phase] -= 1
+        if depth[phase] > 0:
+            return
+        elapsed = perf_counter() - start
+        with self._lock:
+            self.phase_time[phase] += elapsed
+            self.phase_calls[phase] += 1
+            self.phase_bytes[phase] += nbytes
+        if self.callback is not None:
+            self.callback(phase, elapsed, nbytes)
+
+    def count_decoded(self, items):
+        """
+        Count decoded DollarItems by type and by header width
+        """
+        with self._lock:
+            for item in items:
+                typ = item.dollar_type
+                self.items_decoded[typ] = self.items_decoded.get(typ, 0) + 1
+                self.header_widths[item.meta_offset] += 1
+
+    def count_encoded(self, item):
+        """
+        Count an encoded DollarItem by type
+        """
+        with self._lock:
+            self.items_encoded[item.dollar_type] = self.items_encoded.get(item.dollar_type, 0) + 1
+
+    def count_sublists(self, attempts, failures):
+        """
+        Count the sub-list parses tried and failed
+        """
+        with self._lock:
+            self.sublist_attempts += attempts
+            self.sublist_failures += failures
+
+    def as_dict(self):
+        """
+        Return the counters as a dict
+        """
+        with self._lock:
+            return {
+                'items_decoded': dict(self.items_decoded),
+                'items_encoded': dict(self.items_encoded),
+                'header_widths': dict(self.header_widths),
+                'sublist_attempts': self.sublist_attempts,
+                'sublist_failures': self.sublist_failures,
+                'phase_time': dict(self.phase_time),
+                'phase_calls': dict(self.phase_calls),
+                'phase_bytes': dict(self.phase_bytes),
+            }
@@ -0,0 +1,197 @@
+# Module that covers the columnar decoding of $list buffers
+# DollarTable stores many rows sharing the same layout, like
+# ^Patient(id) = $lb(name, dob, status, ...)
+# as one typed column per field instead of a list of lists
+#
+
+from array import array
+
+from .dollar_list import (DollarList, DollarListException, SCALAR_DECODERS,
+                          read_headers, read_item_header)
+from .dollartype import Dollartype
+
+# array typecodes accepted in a schema, None means a column of python objects
+INT_TYPECODES = 'bBhHiIlLqQ'
+FLOAT_TYPECODES = 'fd'
+
+ASCII = Dollartype.ITEM_ASCII.value
+
+class DollarTable:
+    """
+    A class that represents rows of $list decoded as columns
+    """
+
+    def __init__(self, names, typecodes, columns, nulls, rows):
+        # name of each column, the position of the field if no schema is given
+        self.names = names
+        # array typecode of each column, None for a column of python objects
+        self.typecodes = typecodes
+        # one array (typed column) or list (object column) per column
+        self.columns = columns
+        # one bytearray per typed column, 1 where the value is null
+        self.nulls = nulls
+        # number of decoded rows
+        self.rows = rows
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.columns[self.names.index(name)]
+
+    def to_dict(self):
+        """
+        Return a dict of columns.
+        Typed columns are returned as arrays, except int columns holding
+        nulls that are returned as lists with None
+        """
+        response = {}
+        for name, typecode, column, nulls in zip(self.names, self.typecodes,
+                                                 self.columns, self.nulls):
+            if typecode is not None and typecode in INT_TYPECODES and 1 in nulls:
+                column = [None if null else value for value, null in zip(column, nulls)]
+            response[name] = column
+        return response
+
+    def to_pandas(self):
+        """
+        Return a pandas DataFrame, typed columns are shared with numpy
+        without copy. Int columns holding nulls use pandas nullable integers.
+        """
+        try:
+            import numpy # pylint: disable=import-outside-toplevel
+            import pandas # pylint: disable=import-outside-toplevel
+        except ImportError as err:
+            raise DollarListException("pandas is required to build a DataFrame") from err
+        data = {}
+        for name, typecode, column, nulls in zip(self.names, self.typecodes,
+                                                 self.columns, self.nulls):
+            if typecode is None:
+                data[name] = column
+                continue
+            values = numpy.frombuffer(column, dtype=numpy.dtype(typecode))
+            if typecode in INT_TYPECODES and 1 in nulls:
+                mask = numpy.frombuffer(nulls, dtype=numpy.bool_)
+                data[name] = pandas.arrays.IntegerArray(values, mask)
+            else:
+                data[name] = values
+        return pandas.DataFrame(data, columns=self.names)
+
+def decode_table(buffers, schema=None):
+    """
+    Decode an iterable of $list buffers sharing the same layout into a DollarTable
+    schema is an optional list of column names or (name, typecode) tuples,
+    or a dict name -> typecode, where typecode is an array typecode
+    or None for a column of python objects.
+    Missing or trailing fields are null, fields after the schema are ignored.
+    Without schema, columns are named by position and hold python objects.
+    """
+    names, typecodes = _parse_schema(schema)
+    fixed = schema is not None
+    columns = [array(typecode) if typecode else [] for typecode in typecodes]
+    nulls = [bytearray() if typecode else None for typecode in typecodes]
+    rows = 0
+    for buffer in buffers:
+        if isinstance(buffer, DollarList):
+            buffer = buffer.to_bytes()
+        size = len(buffer)
+        offset = 0
+        index = 0
+        while offset < size:
+            typ, start, offset = read_item_header(buffer, offset)
+            if index == len(columns):
+                if fixed:
+                    break
+                names.append(index)
+                typecodes.append(None)
+                columns.append([None] * rows)
+                nulls.append(None)
+            value = _decode_value(typ, buffer[start:offset])
+            if typecodes[index] is None:
+                columns[index].append(value)
+            else:
+                _append_typed(columns[index], nulls[index], value, names[index])
+            index += 1
+        # missing fields of the row are null
+        for index in range(index, len(columns)):
+            if typecodes[index] is None:
+                columns[index].append(None)
+            else:
+                _append_typed(columns[index], nulls[index], None, names[index])
+        rows += 1
+    return DollarTable(names, typecodes, columns, nulls, rows)
+
+def _parse_schema(schema):
+    names = []
+    typecodes = []
+    if schema is None:
+        return names, typecodes
+    if isinstance(schema, dict):
+        schema = schema.items()
+    for column in schema:
+        if isinstance(column, tuple):
+            name, typecode = column
+        else:
+            name, typecode = column, None
+        if typecode is not None and typecode not in INT_TYPECODES + FLOAT_TYPECODES:
+            raise DollarListException(f"Invalid typecode {typecode!r} for column {name!r}")
+        names.append(name)
+        typecodes.append(typecode)
+    return names, typecodes
+
+def _append_typed(column, nulls, value, name):
+    if value is None:
+        column.append(float('nan') if column.typecode in FLOAT_TYPECODES else 0)
+        nulls.append(1)
+        return
+    try:
+        column.append(value)
+    except (TypeError, OverflowError) as err:
+        raise DollarListException(f"Invalid value {value!r} for column {name!r}") from err
+    nulls.append(0)
+
+def _decode_value(typ, raw_value):
+    """
+    Decode a raw value like DollarList.to_list() does, nested lists become lists
+    The nested lists are decoded with an explicit stack like decode_items,
+    without recursion and without creating DollarItems
+    """
+    if typ == ASCII:
+        if raw_value == b'':
+            return None
+        result = [None]
+        # (list, index, start, stop) of the ascii values that may be lists
+        stack = [(result, 0, 0, len(raw_value))]
+        while stack:
+            values, index, start, stop = stack.pop()
+            try:
+                values[index], candidates = _decode_values(raw_value, start, stop)
+            except ValueError:
+                value = raw_value[start:stop]
+                try:
+                    values[index] = value.decode('ascii')
+                except UnicodeDecodeError:
+                    values[index] = value
+                continue
+            stack.extend(candidates)
+        return result[0]
+    decoder = SCALAR_DECODERS.get(typ)
+    if decoder is None:
+        return None
+    return decoder(raw_value)
+
+def _decode_values(buffer, start, end):
+    """
+    Decode the values between start and end, the non empty ascii values
+    are left to the caller as candidates (values, index, start, stop)
+    Raise ValueError if an item can't be read
+    """
+    values = []
+    candidates = []
+    for typ, value_start, stop in read_headers(buffer, start, end):
+        if typ == ASCII and value_start < stop:
+            candidates.append((values, len(values), value_start, stop))
+            values.append(None)
+        else:
+            values.append(_decode_value(typ, buffer[value_start:stop]))
+    return values, candidates
@@ -0,0 +1,140 @@
+# Module that covers the structural validation of $list buffers
+# validate() walks the headers of a buffer without decoding any value
+# to check untrusted bytes before storing or forwarding them
+#
+
+from .dollar_list import DollarList, DollarListException, read_headers
+from .dollartype import Dollartype
+from .limits import DollarListLimits
+
+ASCII = Dollartype.ITEM_ASCII.value
+UNICODE = Dollartype.ITEM_UNICODE.value
+
+# exact or minimal raw value length of the fixed size item types
+_FIXED_LENGTHS = {
+    Dollartype.ITEM_DOUBLE.value: 8,
+    Dollartype.ITEM_COMPACT_DOUBLE.value: 4,
+}
+_MIN_LENGTHS = {
+    # the scale byte
+    Dollartype.ITEM_POSNUM.value: 1,
+    Dollartype.ITEM_NEGNUM.value: 1,
+}
+
+class DollarListValidation:
+    """
+    A class that represents the result of validate()
+    """
+
+    def __init__(self, items=0, total_items=0, max_depth=0, error_offset=None, error=None):
+        # number of items of the list
+        self.items = items
+        # number of items including the items of the nested lists
+        self.total_items = total_items
+        # nesting depth, 1 for a list without nested list
+        self.max_depth = max_depth
+        # offset of the first invalid item, None if the buffer is valid
+        self.error_offset = error_offset
+        # reason of the error
+        self.error = error
+
+    @property
+    def valid(self):
+        return self.error_offset is None
+
+    def __bool__(self):
+        return self.valid
+
+    def __repr__(self):
+        return (f"DollarListValidation(items={self.items}, total_items={self.total_items}, "
+                f"max_depth={self.max_depth}, error_offset={self.error_offset}, "
+                f"error={self.error!r})")
+
+def validate(buffer, recursive=True, limits=None):
+    """
+    Check the structure of a $list buffer without decoding the values:
+    the length of each header, that each item fits in the buffer,
+    the type byte, the length of the fixed size types and of the unicode values.
+    If recursive, the ascii values that are valid lists are considered
+    as nested lists, like DollarList.from_bytes does, and are walked too.
+    limits is a DollarListLimits, a buffer that from_bytes would reject
+    for a limit is invalid.
+    Return a DollarListValidation.
+    """
+    if isinstance(buffer, DollarList):
+        buffer = buffer.to_bytes()
+    if limits is None:
+        limits = DollarListLimits()
+    max_items, max_depth, max_bytes = limits.max_items, limits.max_depth, limits.max_bytes
+    result = DollarListValidation()
+    if max_bytes is not None and len(buffer) > max_bytes:
+        result.error_offset, result.error = 0, f"More than {max_bytes} bytes decoded"
+        return result
+    try:
+        items, sublists = scan(buffer, 0, len(buffer), max_items, limits.max_item_size)
+    except ValueError as err:
+        result.error_offset, result.error = err.args[1], err.args[0]
+        return result
+    result.items = result.total_items = items
+    result.max_depth = 1
+    if not recursive:
+        return result
+    total_bytes = len(buffer)
+    # explicit stack of (start, stop, depth) of the candidate sub-lists
+    stack = [(start, stop, 2) for start, stop in sublists]
+    while stack:
+        start, stop, depth = stack.pop()
+        try:
+            items, sublists = scan(buffer, start, stop)
+        except ValueError:
+            # not a list, an ascii or binary value
+            continue
+        result.total_items += items
+        total_bytes += stop - start
+        result.max_depth = max(result.max_depth, depth)
+        # the same checks and order as decode_items
+        if max_depth is not None and depth > max_depth:
+            result.error = f"Nested lists deeper than {max_depth}"
+        elif max_items is not None and result.total_items > max_items:
+            result.error = f"More than {max_items} items"
+        elif max_bytes is not None and total_bytes > max_bytes:
+            result.error = f"More than {max_bytes} bytes decoded"
+        if result.error is not None:
+            result.error_offset = start
+            return result
+        stack.extend((sub_start, sub_stop, depth + 1) for sub_start, sub_stop in sublists)
+    return result
+
+def scan(buffer, offset, end, max_items=None, max_item_size=None):
+    """
+    Walk the headers of the items between offset and end.
+    Return the number of items and the (start, stop) of the non empty
+    ascii values, the candidate sub-lists.
+    Raise ValueError(reason, offset) on the first invalid item,
+    or if there are more than max_items items or an item is larger
+    than max_item_size.
+    """
+    headers = []
+    try:
+        read_headers(buffer, offset, end, max_items, max_item_size, headers=headers)
+    except (ValueError, DollarListException) as err:
+        # the items read so far end where the invalid item starts
+        raise ValueError(err.args[0], headers[-1][2] if headers else offset) from None
+    sublists = []
+    for typ, start, stop in headers:
+        length = stop - start
+        if typ == ASCII:
+            if length:
+                sublists.append((start, stop))
+        elif typ in _FIXED_LENGTHS:
+            if length != _FIXED_LENGTHS[typ]:
+                raise ValueError("Invalid length", offset)
+        elif typ in _MIN_LENGTHS:
+            if length < _MIN_LENGTHS[typ]:
+                raise ValueError("Invalid length", offset)
+        elif typ == UNICODE:
+            # utf-16, 2 bytes per code unit
+            if length % 2:
+                raise ValueError("Invalid length", offset)
+        offset = stop
+    return len(headers), sublists
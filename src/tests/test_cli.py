@@ -0,0 +1,142 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from io import StringIO
+
+import iris_dollar_list
+from iris_dollar_list import dumps
+from iris_dollar_list.cli import main
+
+RECORDS = [[f'name{i}', i, [1.5, 'x'], None, 'é中'] for i in range(25)]
+
+def frame(buffers):
+    return b''.join(struct.pack('<I', len(buffer)) + buffer for buffer in buffers)
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory() # pylint: disable=consider-using-with
+        self.binary = self.path('records.bin')
+        with open(self.binary, 'wb') as file:
+            file.write(frame([dumps(record) for record in RECORDS]))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def read(self, name):
+        with open(self.path(name), 'rb') as file:
+            return file.read()
+
+    def test_list_to_json(self):
+        self.assertEqual(main([self.binary, '-o', self.path('out.json')]), 0)
+        lines = self.read('out.json').decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(lines[1], '["name1", 1, [1.5, "x"], null, "é中"]')
+
+    def test_round_trip(self):
+        main([self.binary, '-t', 'lb', '-o', self.path('out.lb')])
+        self.assertEqual(self.read('out.lb').decode('utf-8').splitlines()[0],
+                         '$lb("name0",0,$lb(1.5,"x"),"","é中")')
+        main([self.binary, '-o', self.path('out.json')])
+        main([self.path('out.json'), '-f', 'json', '-t', 'list', '-o', self.path('out.bin')])
+        with open(self.binary, 'rb') as file:
+            self.assertEqual(self.read('out.bin'), file.read())
+
+    def test_hex_framing(self):
+        main([self.binary, '-t', 'list', '--out-framing', 'hex', '-o', self.path('out.hex')])
+        lines = self.read('out.hex').splitlines()
+        self.assertEqual(bytes.fromhex(lines[0].decode('ascii')), dumps(RECORDS[0]))
+        main([self.path('out.hex'), '--in-framing', 'hex', '-t', 'list',
+              '-o', self.path('out.bin')])
+        with open(self.binary, 'rb') as file:
+            self.assertEqual(self.read('out.bin'), file.read())
+
+    def test_binary_values(self):
+        with open(self.path('in.bin'), 'wb') as file:
+            file.write(frame([b'\x04\x01\xff\x00']))
+        main([self.path('in.bin'), '-o', self.path('out.json')])
+        main([self.path('out.json'), '-f', 'json', '-t', 'list', '-o', self.path('out.bin')])
+        self.assertEqual(self.read('out.bin'), frame([b'\x04\x01\xff\x00']))
+
+    def test_workers(self):
+        main([self.binary, '-o', self.path('one.json')])
+        main([self.binary, '-o', self.path('many.json'), '-w', '2', '-c', '3'])
+        self.assertEqual(self.read('many.json'), self.read('one.json'))
+
+    def test_stats(self):
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            main([self.binary, '-o', self.path('out.json'), '--stats'])
+        self.assertIn('25 records', stderr.getvalue())
+        self.assertIn('records/s', stderr.getvalue())
+
+    def test_invalid_record(self):
+        with open(self.path('in.lb'), 'wb') as file:
+            file.write(b'$lb(1)\n$lb("a",1\n')
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            self.assertEqual(main([self.path('in.lb'), '-f', 'lb', '-o', self.path('out.json')]), 1)
+        self.assertIn('record 1', stderr.getvalue())
+
+    def test_file_errors(self):
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            self.assertEqual(main([self.path('missing.bin'), '-o', self.path('out.json')]), 1)
+        self.assertIn('iris-dollar-list: [Errno 2]', stderr.getvalue())
+        self.assertIn('missing.bin', stderr.getvalue())
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            self.assertEqual(main([self.binary, '-o', self.path('missing/out.json')]), 1)
+        self.assertIn('out.json', stderr.getvalue())
+
+    def test_control_characters(self):
+        with open(self.path('in.json'), 'wb') as file:
+            file.write(b'["a\\nb", ["\\r\\n", "c\\td"]]\n["e"]\n')
+        main([self.path('in.json'), '-f', 'json', '-t', 'lb', '-o', self.path('out.lb')])
+        self.assertEqual(self.read('out.lb'),
+                         b'$lb("a"_$c(10)_"b",$lb($c(13,10),"c"_$c(9)_"d"))\n$lb("e")\n')
+        main([self.path('out.lb'), '-f', 'lb', '-o', self.path('out.json')])
+        self.assertEqual(self.read('out.json'), self.read('in.json'))
+
+    def test_json_nan(self):
+        with open(self.path('in.json'), 'wb') as file:
+            file.write(b'[1, NaN]\n')
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            self.assertEqual(main([self.path('in.json'), '-f', 'json', '-o',
+                                   self.path('out.bin')]), 1)
+        self.assertIn('record 0: NaN is not a JSON number', stderr.getvalue())
+        with open(self.path('in.bin'), 'wb') as file:
+            file.write(frame([dumps([float('inf')])]))
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            self.assertEqual(main([self.path('in.bin'), '-o', self.path('out.json')]), 1)
+        self.assertIn('record 0', stderr.getvalue())
+
+    def test_truncated(self):
+        with open(self.path('in.bin'), 'wb') as file:
+            file.write(frame([b'\x03\x01t'])[:-1])
+        with redirect_stderr(StringIO()):
+            self.assertEqual(main([self.path('in.bin'), '-o', self.path('out.json')]), 1)
+
+    def test_module(self):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.dirname(os.path.dirname(iris_dollar_list.__file__))
+        result = subprocess.run([sys.executable, '-m', 'iris_dollar_list',
+                                 '-f', 'json', '-t', 'lb'],
+                                input=b'["test", [4]]\n', env=env, capture_output=True,
+                                check=True)
+        self.assertEqual(result.stdout, b'$lb("test",$lb(4))\n')
+
+if __name__ == '__main__':
+    unittest.main()
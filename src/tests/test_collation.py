@@ -0,0 +1,77 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import random
+import struct
+import unittest
+
+from iris_dollar_list import DollarList, merge_lists, sort_key, sort_lists
+
+def lb(*values):
+    return DollarList.from_list(list(values)).to_bytes()
+
+# in IRIS collation order
+ORDERED = [
+    lb(None),
+    lb(-1000),
+    lb(-5),
+    lb(-1.5),
+    lb(-1.25),
+    lb(0),
+    lb(0.5),
+    lb(1),
+    lb(1,None),
+    lb(1,2),
+    lb(1,'a'),
+    lb(2),
+    lb('10'),
+    lb(10.5),
+    lb(123456789012345678901234567890),
+    lb('\x00'),
+    lb('01'),
+    lb('1.0'),
+    lb('a'),
+    lb('a','b'),
+    lb('ab'),
+    lb('b'),
+    lb('é'),
+    lb('Զ'),
+    lb(DollarList.from_list([1])),
+    lb(DollarList.from_list([1]),1),
+    lb(DollarList.from_list([1,2])),
+    lb(DollarList.from_list([2])),
+]
+
+class TestSortKey(unittest.TestCase):
+
+    def test_order(self):
+        keys = [sort_key(value) for value in ORDERED]
+        for i in range(len(keys) - 1):
+            self.assertLess(keys[i],keys[i+1],(ORDERED[i],ORDERED[i+1]))
+
+    def test_same_number(self):
+        self.assertEqual(sort_key(lb(1)),sort_key(lb('1')))
+        self.assertEqual(sort_key(lb(2.5)),sort_key(lb('2.5')))
+        self.assertEqual(sort_key(lb(-3)),sort_key(DollarList.from_list([-3])))
+
+    def test_double(self):
+        def double(value):
+            return b'\x0a\x08' + struct.pack('<d',value)
+        self.assertLess(sort_key(double(-0.5)),sort_key(lb(0)))
+        self.assertEqual(sort_key(double(1.0)),sort_key(lb(1)))
+        self.assertLess(sort_key(double(float('-inf'))),sort_key(lb(-1000)))
+        self.assertLess(sort_key(lb(123456789012345678901234567890)),
+                        sort_key(double(float('inf'))))
+
+    def test_sort_lists(self):
+        shuffled = ORDERED[:]
+        random.Random(4).shuffle(shuffled)
+        self.assertEqual(sort_lists(shuffled),ORDERED)
+        self.assertEqual(sort_lists(shuffled,reverse=True),ORDERED[::-1])
+
+    def test_merge_lists(self):
+        merged = list(merge_lists(ORDERED[::2],ORDERED[1::2]))
+        self.assertEqual(merged,ORDERED)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import random
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from iris_dollar_list import (DollarList, disable_stats, dumps, enable_stats,
+                              loads, register_encoder, unregister_encoder)
+
+def random_values(rng, depth=0):
+    values = []
+    for _ in range(rng.randint(1, 8)):
+        kind = rng.randint(0, 5 if depth < 3 else 4)
+        if kind == 0:
+            values.append(rng.randint(-2**40, 2**40))
+        elif kind == 1:
+            # ascii or utf-16, latin-1 strings are read back as bytes
+            values.append(''.join(rng.choice('abc') for _ in range(rng.randint(1, 300)))
+                          + rng.choice(('', 'é中')))
+        elif kind == 2:
+            values.append(rng.randint(-1000, 1000) / 8)
+        elif kind == 3:
+            values.append(None)
+        elif kind == 4:
+            values.append(rng.randint(0, 255))
+        else:
+            values.append(random_values(rng, depth + 1))
+    return values
+
+class Point: # pylint: disable=too-few-public-methods
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+class TestLoadsDumps(unittest.TestCase):
+
+    def test_round_trip(self):
+        values = ['test', [4, [None, -3]], 2.5]
+        self.assertEqual(dumps(values), b'\x06\x01test\x0c\x01\x03\x04\x04\x07\x01\x02\x01'
+                         b'\x03\x05\xfd\x04\x06\xff\x19')
+        self.assertEqual(loads(dumps(values)), values)
+
+    def test_tuple(self):
+        self.assertEqual(loads(dumps(('t', (1, 2)))), ['t', [1, 2]])
+
+    def test_instances_do_not_share_items(self):
+        dollar_list1 = DollarList(b'\x03\x01t')
+        dollar_list2 = DollarList(b'\x03\x04\x03')
+        self.assertEqual(dollar_list1.to_list(), ['t'])
+        self.assertEqual(dollar_list2.to_list(), [3])
+        self.assertEqual(DollarList().to_list(), [])
+
+class TestConcurrency(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(35)
+        self.cases = [random_values(rng) for _ in range(200)]
+        self.expected = [(dumps(values), str(DollarList.from_list(values)))
+                         for values in self.cases]
+
+    def check(self, index):
+        values = self.cases[index]
+        buffer, text = self.expected[index]
+        self.assertEqual(dumps(values), buffer)
+        self.assertEqual(loads(buffer), values)
+        dollar_list = DollarList.from_bytes(buffer)
+        self.assertEqual(str(dollar_list), text)
+        self.assertEqual(hash(dollar_list), hash(DollarList(values)))
+        return True
+
+    def hammer(self, workers=8, rounds=20):
+        indexes = list(range(len(self.cases))) * rounds
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            self.assertTrue(all(executor.map(self.check, indexes)))
+
+    def test_threads(self):
+        self.hammer()
+
+    def test_threads_with_stats(self):
+        stats = enable_stats()
+        try:
+            self.hammer(rounds=5)
+        finally:
+            disable_stats()
+        # check() decodes each buffer twice, with loads and from_bytes,
+        # no call is lost by the threads
+        self.assertEqual(stats.phase_calls['decode'], 2 * len(self.cases) * 5)
+
+    def test_threads_with_registration(self):
+        self.addCleanup(unregister_encoder, Point)
+        def register():
+            register_encoder(Point, lambda point: [point.x, point.y])
+            return loads(dumps([Point(1, 2)]))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(register) for _ in range(50)]
+            futures += [executor.submit(self.check, index) for index in range(len(self.cases))]
+            results = [future.result() for future in futures]
+        self.assertEqual(results[:50], [[[1, 2]]] * 50)
+
+if __name__ == '__main__':
+    unittest.main()
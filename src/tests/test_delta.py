@@ -0,0 +1,102 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import random
+import unittest
+from zlib import crc32
+
+from iris_dollar_list import (DollarList, DollarListException, diff_lists, dumps,
+                              patch_list)
+from iris_dollar_list.delta import read_patch, split_items
+
+from .test_fuzz import random_item
+
+class TestDollarListDelta(unittest.TestCase):
+
+    def setUp(self):
+        self.old = dumps(['name', 1, 2.5, None, 'x', [1, 2]] + list(range(50)))
+
+    def test_split_items(self):
+        self.assertEqual(split_items(dumps(['test', [4]])),
+                         [b'\x06\x01test', b'\x05\x01\x03\x04\x04'])
+        self.assertEqual(split_items(b''), [])
+        with self.assertRaisesRegex(DollarListException, 'Invalid \\$list'):
+            split_items(b'\x03\x01')
+
+    def test_invalid_buffer(self):
+        corrupt = self.old + b'\x03\x01'
+        with self.assertRaisesRegex(DollarListException, 'Invalid \\$list'):
+            diff_lists(corrupt, self.old)
+        with self.assertRaisesRegex(DollarListException, 'Invalid \\$list'):
+            diff_lists(self.old, corrupt)
+        with self.assertRaisesRegex(DollarListException, 'Invalid \\$list'):
+            patch_list(corrupt, dumps([crc32(corrupt)]))
+
+    def test_one_field(self):
+        new = dumps(['name', 1, 3.5, None, 'x', [1, 2]] + list(range(50)))
+        patch = diff_lists(self.old, new)
+        # the changed item only
+        self.assertEqual(read_patch(patch)[1], [(2, 1, dumps([3.5]))])
+        self.assertLess(len(patch), 20)
+        self.assertEqual(patch_list(self.old, patch), new)
+
+    def test_insert_and_delete(self):
+        new = dumps(['name', 'y', 1, 2.5, 'x', [1, 2]] + list(range(50)))
+        patch = diff_lists(self.old, new)
+        self.assertEqual(read_patch(patch)[1], [(1, 0, dumps(['y'])), (3, 1, b'')])
+        self.assertEqual(patch_list(self.old, patch), new)
+
+    def test_nested_list(self):
+        new = dumps(['name', 1, 2.5, None, 'x', [1, 3]] + list(range(50)))
+        self.assertEqual(read_patch(diff_lists(self.old, new))[1], [(5, 1, dumps([[1, 3]]))])
+
+    def test_same(self):
+        patch = diff_lists(self.old, self.old)
+        self.assertEqual(read_patch(patch)[1], [])
+        self.assertEqual(patch_list(self.old, patch), self.old)
+
+    def test_empty(self):
+        self.assertEqual(patch_list(self.old, diff_lists(self.old, b'')), b'')
+        self.assertEqual(patch_list(b'', diff_lists(b'', self.old)), self.old)
+
+    def test_dollar_list(self):
+        old = DollarList.from_bytes(self.old)
+        new = DollarList.from_list(['name', 2])
+        self.assertEqual(patch_list(old, diff_lists(old, new)), new.to_bytes())
+
+    def test_other_buffer(self):
+        patch = diff_lists(self.old, dumps(['name']))
+        with self.assertRaisesRegex(DollarListException, 'not made from this buffer'):
+            patch_list(dumps(['other']), patch)
+
+    def test_invalid_patch(self):
+        for patch in (b'', b'\x03\x01t', dumps([1, 2]), dumps([1, 2, 3, 4]),
+                      dumps([1, 2, 3, b'\x03\x01'])):
+            with self.assertRaises(DollarListException, msg=patch):
+                read_patch(patch)
+        with self.assertRaisesRegex(DollarListException, 'out of the list'):
+            patch_list(self.old, dumps([crc32(self.old), 50, 10, b'']))
+        with self.assertRaisesRegex(DollarListException, 'out of the list'):
+            patch_list(self.old, dumps([crc32(self.old), 3, 1, b'', 2, 0, b'']))
+
+    def test_random(self):
+        rng = random.Random(42)
+        for iteration in range(300):
+            old = [random_item(rng)[0] for _ in range(rng.randint(0, 30))]
+            new = list(old)
+            for _ in range(rng.randint(0, 4)):
+                index = rng.randint(0, len(new))
+                edit = rng.randint(0, 2)
+                if edit == 0:
+                    new.insert(index, random_item(rng)[0])
+                elif index < len(new):
+                    if edit == 1:
+                        del new[index]
+                    else:
+                        new[index] = random_item(rng)[0]
+            old, new = b''.join(old), b''.join(new)
+            with self.subTest(iteration=iteration):
+                self.assertEqual(patch_list(old, diff_lists(old, new)), new)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,416 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+# Generator-driven round trip and differential tests
+# Random values and random encoded items are checked against the reference
+# DollarListReader and DollarListWriter, and against a recursive decoder of
+# this module that shares no code with decode_items, and corrupt buffers must
+# fail with ValueError or DollarListException only.
+# DOLLAR_LIST_FUZZ_SEED and DOLLAR_LIST_FUZZ_ITERATIONS change the runs.
+
+import os
+import random
+import struct
+import unittest
+
+from iris_dollar_list import (DollarList, DollarListException, DollarSchema, decode_table,
+                              dumps, loads, validate)
+from iris_dollar_list.dollar_list import DollarListReader, DollarListWriter
+
+SEED = int(os.environ.get('DOLLAR_LIST_FUZZ_SEED', '1840'))
+ITERATIONS = int(os.environ.get('DOLLAR_LIST_FUZZ_ITERATIONS', '300'))
+
+# exceptions of a safe failure
+SAFE_ERRORS = (ValueError, DollarListException)
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ '
+
+def random_length(rng):
+    # lengths around the limits of the 2, 4 and 8 bytes headers
+    return rng.choice((
+        rng.randint(1, 20),
+        rng.randint(1, 20),
+        rng.randint(250, 256),
+        rng.randint(65530, 65536) if rng.random() < 0.05 else 3,
+    ))
+
+def random_float(rng):
+    return rng.choice((
+        rng.randint(-10**6, 10**6) / 8,
+        rng.uniform(-1e6, 1e6),
+        rng.random() * 10.0 ** rng.randint(-300, 300) * rng.choice((1, -1)),
+        5e-324,
+        0.0,
+    ))
+
+def random_value(rng, depth=0): # pylint: disable=too-many-return-statements
+    """
+    Return a python value that loads(dumps()) gives back unchanged
+    """
+    kind = rng.randint(0, 7 if depth < 4 else 6)
+    if kind == 0:
+        return None
+    if kind == 1:
+        # letters only, so that the value is never read as a sub-list
+        return ''.join(rng.choice(LETTERS) for _ in range(random_length(rng)))
+    if kind == 2:
+        # utf-16, latin-1 strings are read back as bytes
+        return ''.join(rng.choice(LETTERS + 'é中ü\ud800\ufeff')
+                       for _ in range(rng.randint(0, 20))) + '中'
+    if kind == 3:
+        return rng.randint(-2**(8 * rng.randint(1, 9)), 2**(8 * rng.randint(1, 9)))
+    if kind == 4:
+        return random_float(rng)
+    if kind == 5:
+        # not ascii and not a sub-list as 0xff is longer than the value
+        return b'\xff' + bytes(rng.randint(0, 255) for _ in range(rng.randint(0, 100)))
+    if kind == 6:
+        return rng.randint(0, 255)
+    return random_values(rng, depth + 1)
+
+def random_values(rng, depth=0):
+    return [random_value(rng, depth) for _ in range(rng.randint(1, 8))]
+
+def encode_item(typ, raw_value, width):
+    """
+    Encode an item with a header of 2, 4 or 8 bytes, the smallest if it doesn't fit
+    """
+    if width == 2 and len(raw_value) + 2 <= 255:
+        return bytes((len(raw_value) + 2, typ)) + raw_value
+    if width <= 4 and len(raw_value) + 1 <= 65535:
+        return b'\x00' + (len(raw_value) + 1).to_bytes(2, 'little') + bytes((typ,)) + raw_value
+    return b'\x00\x00\x00' + (len(raw_value) + 1).to_bytes(4, 'little') + bytes((typ,)) + raw_value
+
+def random_item(rng, depth=0): # pylint: disable=too-many-return-statements
+    """
+    Return a random encoded item of any type and header width,
+    and its python value
+    """
+    width = rng.choice((2, 2, 4, 8))
+    typ = rng.choice((1, 1, 2, 3, 4, 5, 6, 7, 8, 9) + ((0,) if depth < 4 else ()))
+    if typ == 0:
+        # a sub-list
+        items = [random_item(rng, depth + 1) for _ in range(rng.randint(1, 6))]
+        raw_value = b''.join(item for item, _ in items)
+        return encode_item(1, raw_value, width), [value for _, value in items]
+    if typ == 1:
+        value = ''.join(rng.choice(LETTERS) for _ in range(rng.randint(0, 300)))
+        return encode_item(typ, value.encode('ascii'), width), value or None
+    if typ == 2:
+        value = ''.join(rng.choice('aé中\U0001f600\ufeff') for _ in range(rng.randint(0, 10)))
+        return encode_item(typ, value.encode('utf-16-le'), width), value
+    if typ == 3:
+        # not used, decoded as None
+        return encode_item(typ, bytes(rng.randint(0, 3)), width), None
+    if typ in (4, 5):
+        value = rng.randint(0, 2**(8 * rng.randint(0, 9)))
+        if typ == 5:
+            value = -value - 1
+        raw_value = value.to_bytes(rng.randint(0, 2) + ((value.bit_length() + 8) // 8), 'little',
+                                   signed=True)
+        if typ == 4:
+            raw_value = value.to_bytes((value.bit_length() + 7) // 8, 'little')
+        return encode_item(typ, raw_value, width), value
+    if typ in (6, 7):
+        num = rng.randint(0, 10**rng.randint(0, 20))
+        if typ == 7:
+            num = -num - 1
+        scale = rng.randint(-20, 20)
+        raw_value = scale.to_bytes(1, 'little', signed=True) + num.to_bytes(
+            ((num.bit_length() if num >= 0 else (~num).bit_length()) + 8) // 8, 'little',
+            signed=True)
+        return encode_item(typ, raw_value, width), float(f'{num}E{scale}')
+    if typ == 8:
+        value = random_float(rng)
+        return encode_item(typ, struct.pack('<d', value), width), value
+    value = struct.unpack('<f', struct.pack('<f', rng.uniform(-1e6, 1e6)))[0]
+    return encode_item(typ, struct.pack('<f', value), width), value
+
+def random_buffer(rng):
+    items = [random_item(rng) for _ in range(rng.randint(1, 8))]
+    return b''.join(item for item, _ in items), [value for _, value in items]
+
+def item_fields(items):
+    return [(item.dollar_type, item.raw_value, item.buffer, item.offset,
+             item.meta_value_length, item.meta_offset) for item in items]
+
+def reference_header(buffer, offset):
+    """
+    Return the type, start and stop of the raw value of the item at offset,
+    the reference of read_item_header
+    Raise ValueError if the header is invalid
+    """
+    if len(buffer) - offset < 2:
+        raise ValueError("Invalid length")
+    if buffer[offset]:
+        # the length includes the 2 bytes header
+        start, stop = offset + 2, offset + buffer[offset]
+        if buffer[offset] < 2:
+            raise ValueError("Invalid length")
+    elif len(buffer) - offset < 4:
+        raise ValueError("Invalid length")
+    elif buffer[offset + 1] or buffer[offset + 2]:
+        # the length includes the type byte
+        start = offset + 4
+        stop = start - 1 + int.from_bytes(buffer[offset + 1:offset + 3], 'little')
+    elif len(buffer) - offset < 8 or not any(buffer[offset + 3:offset + 7]):
+        raise ValueError("Invalid length")
+    else:
+        start = offset + 8
+        stop = start - 1 + int.from_bytes(buffer[offset + 3:offset + 7], 'little')
+    if stop > len(buffer):
+        raise ValueError("Invalid length")
+    if not 1 <= buffer[start - 1] <= 9:
+        raise ValueError("Invalid type")
+    return buffer[start - 1], start, stop
+
+def reference_number(raw_value, signed):
+    if not raw_value:
+        raise ValueError("Invalid length")
+    num = int.from_bytes(raw_value[1:], 'little', signed=signed)
+    scale = int.from_bytes(raw_value[:1], 'little', signed=True)
+    return float(f'{num}E{scale}')
+
+def reference_float(raw_value, fmt):
+    if len(raw_value) != struct.calcsize(fmt):
+        raise ValueError("Invalid length")
+    return struct.unpack(fmt, raw_value)[0]
+
+# the reference of the decoders of the types other than ascii
+REFERENCE_DECODERS = {
+    2: lambda raw_value: raw_value.decode('utf-16-le', 'surrogatepass'),
+    3: lambda raw_value: None,
+    4: lambda raw_value: int.from_bytes(raw_value, 'little'),
+    5: lambda raw_value: int.from_bytes(raw_value, 'little', signed=True),
+    6: lambda raw_value: reference_number(raw_value, False),
+    7: lambda raw_value: reference_number(raw_value, True),
+    8: lambda raw_value: reference_float(raw_value, '<d'),
+    9: lambda raw_value: reference_float(raw_value, '<f'),
+}
+
+def reference_values(buffer):
+    """
+    Decode buffer by recursion, sub-lists as lists: a non empty ascii
+    value is a nested list if it can be decoded as a list
+    Raise ValueError if an item can't be decoded
+    """
+    values = []
+    offset = 0
+    while offset < len(buffer):
+        typ, start, offset = reference_header(buffer, offset)
+        raw_value = buffer[start:offset]
+        if typ != 1:
+            values.append(REFERENCE_DECODERS[typ](raw_value))
+        elif not raw_value:
+            values.append(None)
+        else:
+            try:
+                values.append(reference_values(raw_value))
+            except ValueError:
+                try:
+                    values.append(raw_value.decode('ascii'))
+                except UnicodeDecodeError:
+                    values.append(raw_value)
+    return values
+
+def writer_item(typ, raw_value):
+    return DollarListWriter.get_meta_value_length(raw_value) + bytes((typ,)) + raw_value
+
+def shortest_headers(buffer):
+    """
+    Encode the items of buffer and of its nested lists again with the headers
+    of the writer, the shortest ones, like the decoded lists do, by recursion
+    """
+    items = []
+    offset = 0
+    while offset < len(buffer):
+        typ, start, offset = reference_header(buffer, offset)
+        raw_value = buffer[start:offset]
+        if typ == 1 and raw_value:
+            try:
+                reference_values(raw_value)
+            except ValueError:
+                pass
+            else:
+                raw_value = shortest_headers(raw_value)
+        items.append(writer_item(typ, raw_value))
+    return b''.join(items)
+
+def reference_items(buffer):
+    """
+    Items of DollarListReader as decoded from buffer with the shortest headers
+    """
+    return DollarListReader(shortest_headers(buffer)).items
+
+def corrupt(rng, buffer):
+    """
+    Return a truncated, flipped or extended copy of buffer
+    """
+    kind = rng.randint(0, 3)
+    if kind == 0:
+        return buffer[:rng.randint(0, len(buffer) - 1)]
+    data = bytearray(buffer)
+    if kind == 1:
+        for _ in range(rng.randint(1, 4)):
+            data[rng.randrange(len(data))] = rng.randint(0, 255)
+    elif kind == 2:
+        data[rng.randrange(len(data))] ^= 1 << rng.randint(0, 7)
+    else:
+        data.insert(rng.randint(0, len(data)), rng.randint(0, 255))
+    return bytes(data)
+
+class TestRoundTrip(unittest.TestCase):
+
+    def test_values(self):
+        rng = random.Random(SEED)
+        for iteration in range(ITERATIONS):
+            values = random_values(rng)
+            with self.subTest(seed=SEED, iteration=iteration):
+                buffer = dumps(values)
+                self.assertEqual(loads(buffer), values)
+                # the reference writer, one item at a time
+                reference = DollarList()
+                for value in values:
+                    reference.append(value)
+                self.assertEqual(reference.to_bytes(), buffer)
+                self.assertEqual(reference_values(buffer), values)
+
+    def test_items(self):
+        rng = random.Random(SEED)
+        for iteration in range(ITERATIONS):
+            buffer, values = random_buffer(rng)
+            with self.subTest(seed=SEED, iteration=iteration):
+                dollar_list = DollarList.from_bytes(buffer)
+                self.assertEqual(dollar_list.to_list(), values)
+                self.assertEqual(dollar_list.to_bytes(), shortest_headers(buffer))
+                self.assertTrue(validate(buffer))
+
+    def test_header_widths(self):
+        # the same item with each header width
+        for raw_value in (b'', b'a', b'a' * 252, b'a' * 253,
+                          b'a' * 65534, b'a' * 65535, b'a' * 70000):
+            value = raw_value.decode('ascii') or None
+            for width in (2, 4, 8):
+                with self.subTest(length=len(raw_value), width=width):
+                    buffer = encode_item(1, raw_value, width)
+                    self.assertEqual(loads(buffer), [value])
+                    self.assertEqual(item_fields(DollarList.from_bytes(buffer).items),
+                                     item_fields(reference_items(buffer)))
+        self.assertEqual(len(DollarListWriter().create_from_string('a' * 70000).buffer), 70008)
+
+class TestDifferential(unittest.TestCase):
+
+    def test_decode_items(self):
+        rng = random.Random(SEED + 1)
+        for iteration in range(ITERATIONS):
+            buffer, _ = random_buffer(rng)
+            with self.subTest(seed=SEED + 1, iteration=iteration):
+                fast = DollarList.from_bytes(buffer)
+                reference = DollarListReader(buffer)
+                self.assertEqual(item_fields(fast.items), item_fields(reference_items(buffer)))
+                self.assertEqual(fast.to_list(), reference_values(buffer))
+                self.assertEqual(str(fast), str(DollarList(reference.items)))
+
+    def test_decode_table(self):
+        rng = random.Random(SEED + 2)
+        buffers = [random_buffer(rng)[0] for _ in range(ITERATIONS)]
+        table = decode_table(buffers)
+        for row, buffer in enumerate(buffers):
+            values = reference_values(buffer)
+            values += [None] * (len(table.columns) - len(values))
+            with self.subTest(seed=SEED + 2, row=row):
+                self.assertEqual([column[row] for column in table.columns], values)
+
+    def test_schema(self):
+        rng = random.Random(SEED + 3)
+        schema = DollarSchema([('name', 'ascii'), ('label', 'str'), ('count', 'int'),
+                               ('score', 'num'), ('scores', ['num'])])
+        for iteration in range(ITERATIONS):
+            record = (
+                ''.join(rng.choice(LETTERS) for _ in range(random_length(rng))),
+                rng.choice((None, 'abc', 'é中')),
+                rng.randint(-2**70, 2**70),
+                random_float(rng),
+                [random_float(rng) for _ in range(rng.randint(1, 5))],
+            )
+            with self.subTest(seed=SEED + 3, iteration=iteration):
+                buffer = schema.encode(record)
+                self.assertEqual(buffer, dumps(record))
+                self.assertEqual(schema.decode(buffer), tuple(reference_values(buffer)))
+
+    def test_validate(self):
+        rng = random.Random(SEED + 4)
+        for iteration in range(ITERATIONS):
+            buffer, _ = random_buffer(rng)
+            with self.subTest(seed=SEED + 4, iteration=iteration):
+                result = validate(buffer)
+                self.assertTrue(result)
+                self.assertEqual(result.items, len(DollarListReader(buffer).items))
+
+    def test_packed_numbers(self):
+        rng = random.Random(SEED + 5)
+        for iteration in range(ITERATIONS):
+            size = rng.randint(1, 50)
+            ints = [rng.randint(-2**(8 * rng.randint(0, 9)), 2**(8 * rng.randint(0, 9)))
+                    for _ in range(size)]
+            floats = [random_float(rng) for _ in range(size)]
+            floats += [float('inf'), float('-inf'), float('nan'), -0.0, 1e+22, -3.3e-30]
+            with self.subTest(seed=SEED + 5, iteration=iteration):
+                for values in (ints, floats):
+                    writer = DollarListWriter()
+                    self.assertEqual(dumps(values), b''.join(
+                        writer.create_dollar_item(value).buffer for value in values))
+
+class TestCorruption(unittest.TestCase):
+
+    def check(self, buffer):
+        result = validate(buffer)
+        try:
+            dollar_list = DollarList.from_bytes(buffer)
+        except SAFE_ERRORS:
+            self.assertFalse(result)
+        else:
+            self.assertTrue(result, buffer)
+            # a decoded list can be used
+            self.assertEqual(DollarList.from_bytes(dollar_list.to_bytes()).to_list(),
+                             dollar_list.to_list())
+            str(dollar_list)
+        try:
+            reference = reference_items(buffer)
+            values = reference_values(buffer)
+        except SAFE_ERRORS:
+            self.assertFalse(result)
+        else:
+            self.assertEqual(item_fields(reference), item_fields(dollar_list.items))
+            # repr, a NaN is not equal to itself
+            self.assertEqual(repr(values), repr(dollar_list.to_list()))
+        try:
+            decode_table([buffer])
+        except SAFE_ERRORS:
+            pass
+
+    def test_truncated(self):
+        rng = random.Random(SEED + 5)
+        for iteration in range(ITERATIONS // 10):
+            buffer, _ = random_buffer(rng)
+            # every truncation of the first items
+            for size in range(min(len(buffer), 300)):
+                with self.subTest(seed=SEED + 5, iteration=iteration, size=size):
+                    self.check(buffer[:size])
+
+    def test_corrupt(self):
+        rng = random.Random(SEED + 6)
+        for iteration in range(ITERATIONS * 5):
+            buffer, _ = random_buffer(rng)
+            with self.subTest(seed=SEED + 6, iteration=iteration):
+                self.check(corrupt(rng, buffer))
+
+    def test_garbage(self):
+        rng = random.Random(SEED + 7)
+        for iteration in range(ITERATIONS * 5):
+            buffer = bytes(rng.randint(0, 255) for _ in range(rng.randint(1, 40)))
+            with self.subTest(seed=SEED + 7, iteration=iteration):
+                self.check(buffer)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import os
+import subprocess
+import sys
+import unittest
+
+import iris_dollar_list
+
+# modules that the minimal loads/dumps path must not import
+HEAVY_MODULES = ('enum', 'typing', 'dataclasses', 'decimal', 're', 'datetime',
+                 'inspect', 'threading', 'array', 'numpy', 'pandas')
+
+def run_python(code):
+    """
+    Run code in a new interpreter with -X importtime,
+    return the imported modules and their cumulative time in microseconds
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(iris_dollar_list.__file__))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            env=env, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules, result.stdout
+
+class TestImportTime(unittest.TestCase):
+
+    def test_minimal_import(self):
+        modules, _ = run_python('import iris_dollar_list')
+        self.assertIn('iris_dollar_list', modules)
+        self.assertEqual([name for name in HEAVY_MODULES if name in modules], [])
+        self.assertEqual([name for name in modules if name.startswith('iris_dollar_list.')],
+                         ['iris_dollar_list.dollar_list'])
+
+    def test_loads_dumps(self):
+        modules, stdout = run_python(
+            'from iris_dollar_list import loads, dumps\n'
+            'print(loads(dumps(["test", [4, 2.5], None])))')
+        self.assertEqual(stdout.strip(), "['test', [4, 2.5], None]")
+        self.assertEqual([name for name in HEAVY_MODULES if name in modules], [])
+
+    def test_lazy_features(self):
+        modules, stdout = run_python(
+            'import decimal\n'
+            'from iris_dollar_list import Dollartype, dumps, validate\n'
+            'print(Dollartype.ITEM_ASCII.value, dumps([decimal.Decimal("1.5")]), '
+            'bool(validate(b"\\x03\\x01t")))')
+        self.assertEqual(stdout.strip(), "1 b'\\x04\\x06\\xff\\x0f' True")
+        self.assertIn('iris_dollar_list.dollartype', modules)
+        self.assertIn('iris_dollar_list.validator', modules)
+        self.assertNotIn('iris_dollar_list.schema', modules)
+
+    def test_star_import(self):
+        modules, stdout = run_python(
+            'from iris_dollar_list import *\n'
+            'print(Dollartype.ITEM_ASCII.value, loads(dumps([1])), callable(validate))')
+        self.assertEqual(stdout.strip(), "1 [1] True")
+        self.assertIn('iris_dollar_list.table', modules)
+        modules, stdout = run_python(
+            'from iris_dollar_list.dollar_list import *\n'
+            'print(Dollartype.ITEM_ASCII.value, callable(unregister_encoder))')
+        self.assertEqual(stdout.strip(), "1 True")
+
+    def test_all(self):
+        self.assertIn('DollarSchema', iris_dollar_list.__all__)
+        for name in iris_dollar_list.__all__:
+            self.assertTrue(hasattr(iris_dollar_list, name), name)
+
+    def test_dir(self):
+        self.assertIn('DollarSchema', dir(iris_dollar_list))
+        with self.assertRaises(AttributeError):
+            iris_dollar_list.not_an_attribute # pylint: disable=pointless-statement
+
+if __name__ == '__main__':
+    unittest.main()
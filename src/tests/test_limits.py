@@ -0,0 +1,135 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import random
+import tracemalloc
+import unittest
+
+from iris_dollar_list import (DollarList, DollarListException, DollarListLimits,
+                              DollarListUsage, DollarListWriter, dumps, loads, validate)
+
+from .test_fuzz import random_buffer
+
+class TestDollarListLimits(unittest.TestCase):
+
+    def setUp(self):
+        # $lb("test",$lb(4,$lb("a")),"b")
+        self.data = dumps(['test', [4, ['a']], 'b'])
+
+    def test_no_limit(self):
+        self.assertEqual(loads(self.data, limits=DollarListLimits()), ['test', [4, ['a']], 'b'])
+
+    def test_max_items(self):
+        # 3 + 2 + 1 items
+        loads(self.data, limits=DollarListLimits(max_items=6))
+        with self.assertRaisesRegex(DollarListException, 'More than 5 items'):
+            loads(self.data, limits=DollarListLimits(max_items=5))
+        with self.assertRaisesRegex(DollarListException, 'More than 2 items'):
+            loads(self.data, limits=DollarListLimits(max_items=2))
+
+    def test_max_items_nested(self):
+        # the items of a nested list are not created past the limit
+        data = dumps([list(range(300000))])
+        self.assertGreater(len(data), 900000)
+        tracemalloc.start()
+        try:
+            with self.assertRaisesRegex(DollarListException, 'More than 10 items'):
+                DollarList.from_bytes(data, limits=DollarListLimits(max_items=10))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        # the raw value and the buffer of the item holding the nested list,
+        # 300000 items would take more than 30 MB
+        self.assertLess(peak, 3 * len(data))
+        # a value with too many items that is not a list is a string
+        data = dumps(['test', dumps(list(range(20)))[:-1]])
+        self.assertEqual(len(loads(data, limits=DollarListLimits(max_items=10))), 2)
+
+    def test_max_depth(self):
+        loads(self.data, limits=DollarListLimits(max_depth=3))
+        with self.assertRaisesRegex(DollarListException, 'deeper than 2'):
+            loads(self.data, limits=DollarListLimits(max_depth=2))
+        # the lowest of max_depth and of the limits
+        with self.assertRaises(DollarListException):
+            loads(self.data, 2, DollarListLimits(max_depth=3))
+
+    def test_max_item_size(self):
+        # the raw value of the nested list is the largest
+        loads(self.data, limits=DollarListLimits(max_item_size=8))
+        with self.assertRaisesRegex(DollarListException, 'larger than 7 bytes'):
+            loads(self.data, limits=DollarListLimits(max_item_size=7))
+
+    def test_max_bytes(self):
+        # 19 bytes, the nested lists of 8 and 3 bytes are decoded again
+        self.assertEqual(len(self.data), 19)
+        loads(self.data, limits=DollarListLimits(max_bytes=30))
+        with self.assertRaisesRegex(DollarListException, 'More than 29 bytes'):
+            loads(self.data, limits=DollarListLimits(max_bytes=29))
+        with self.assertRaises(DollarListException):
+            loads(self.data, limits=DollarListLimits(max_bytes=18))
+
+    def test_nested_amplification(self):
+        # each level holds the next one, the bytes decoded grow with the square of the depth
+        data = b'\x03\x04\x01'
+        for _ in range(200):
+            data = DollarList.from_list([DollarList.from_bytes(data)]).to_bytes()
+        with self.assertRaises(DollarListException):
+            DollarList.from_bytes(data, limits=DollarListLimits(max_bytes=10 * len(data)))
+        usage = DollarListUsage()
+        DollarList.from_bytes(data, usage=usage)
+        self.assertGreater(usage.bytes_decoded, 10 * len(data))
+
+    def test_usage(self):
+        usage = DollarListUsage()
+        loads(self.data, usage=usage)
+        self.assertEqual((usage.items, usage.lists, usage.depth), (6, 2, 3))
+        self.assertEqual(usage.objects, 8)
+        self.assertEqual(usage.bytes_decoded, 30)
+        # raw values and buffers of the items of the 3 levels,
+        # the items holding a nested list are views of the buffer
+        self.assertEqual(usage.bytes_allocated, (4 + 6) + (1 + 3) + (1 + 3) + (1 + 3))
+
+    def test_usage_nested(self):
+        # each level does not copy the bytes of its nested lists
+        data = dumps([str(i) for i in range(20000)])
+        self.assertGreater(len(data), 100000)
+        for _ in range(300):
+            data = DollarListWriter.get_meta_value_length(data) + b'\x01' + data
+        usage = DollarListUsage()
+        dollar_list = DollarList.from_bytes(data, usage=usage)
+        self.assertEqual(usage.depth, 301)
+        self.assertLess(usage.bytes_allocated, 3 * len(data))
+        self.assertEqual(dollar_list.to_bytes(), data)
+        for _ in range(300):
+            dollar_list = dollar_list[0].value
+        self.assertEqual(dollar_list[19999].value, '19999')
+
+    def test_validate(self):
+        self.assertTrue(validate(self.data, limits=DollarListLimits(6, 3, 8, 30)))
+        result = validate(self.data, limits=DollarListLimits(max_items=2))
+        self.assertEqual((result.error, result.error_offset), ('More than 2 items', 16))
+        result = validate(self.data, limits=DollarListLimits(max_depth=2))
+        self.assertEqual((result.error, result.error_offset), ('Nested lists deeper than 2', 13))
+        result = validate(self.data, limits=DollarListLimits(max_item_size=7))
+        self.assertEqual(result.error_offset, 6)
+        self.assertFalse(validate(self.data, limits=DollarListLimits(max_bytes=29)))
+
+    def test_same_as_decode(self):
+        rng = random.Random(2023)
+        for iteration in range(300):
+            buffer, _ = random_buffer(rng)
+            limits = DollarListLimits(rng.choice((None, rng.randint(1, 30))),
+                                      rng.choice((None, rng.randint(1, 4))),
+                                      rng.choice((None, rng.randint(0, 300))),
+                                      rng.choice((None, rng.randint(1, 3 * len(buffer)))))
+            with self.subTest(iteration=iteration, limits=limits):
+                result = validate(buffer, limits=limits)
+                try:
+                    DollarList.from_bytes(buffer, limits=limits)
+                except DollarListException as err:
+                    self.assertEqual(result.error, str(err))
+                else:
+                    self.assertTrue(result)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,13 @@
 # Licensed under the MIT License
 # https://github.com/grongierisc/dollar-list/blob/main/LICENSE
 
+import io
+import math
 import unittest
 
-from iris_dollar_list import DollarList
+from iris_dollar_list import (DollarItem, DollarList, DollarListException,
+                              enable_stats, disable_stats, get_stats, dumps, loads)
+from iris_dollar_list.dollar_list import DollarListWriter
 from src.iris_dollar_list.dollar_list import DollarListReader
 
 class TestDollarListReaderGetItemLengh(unittest.TestCase):
@@ -70,6 +74,18 @@ class TestDollarListReaderGetItemType(unittest.TestCase):
         item_value = reader.get_item_value(0)
         self.assertEqual(item_value,'Զ')
 
+    def test_unicode_type_with_bom(self):
+        # U+FEFF is a character of the string
+        data = b'\x06\x02\xff\xfe6\x05'
+        reader = DollarListReader(data)
+        item_value = reader.get_item_value(0)
+        self.assertEqual(item_value,'\ufeffԶ')
+        self.assertEqual(DollarListReader.get_legacy_unicode(b'\xff\xfe6\x05'),'Զ')
+
+    def test_unicode_starting_with_feff(self):
+        data = DollarList.from_list(['\ufeffabc']).to_bytes()
+        self.assertEqual(DollarList.from_bytes(data).to_list(),['\ufeffabc'])
+
     def test_positive_integer_type(self):
         data = b'\x03\x04\x01'
         reader = DollarListReader(data)
@@ -108,7 +124,18 @@ class TestDollarWriter(unittest.TestCase):
     def test_write_unicode(self):
         dollar_list = DollarList()
         dollar_list.append('Զ')
-        self.assertEqual(dollar_list.to_bytes(),b'\x06\x02\xff\xfe6\x05')
+        self.assertEqual(dollar_list.to_bytes(),b'\x04\x026\x05')
+
+    def test_write_latin1(self):
+        dollar_list = DollarList()
+        dollar_list.append('é')
+        self.assertEqual(dollar_list.to_bytes(),b'\x03\x01\xe9')
+
+    def test_write_mixed_unicode(self):
+        dollar_list = DollarList()
+        dollar_list.append('aé中')
+        self.assertEqual(dollar_list.to_bytes(),b'\x08\x02a\x00\xe9\x00\x2d\x4e')
+        self.assertEqual(DollarList.from_bytes(dollar_list.to_bytes()).to_list(),['aé中'])
 
     def test_write_positive_integer(self):
         dollar_list = DollarList()
@@ -242,6 +269,15 @@ class TestDollarList(unittest.TestCase):
         dollar_list = DollarList.from_list(['t'])
         self.assertEqual(dollar_list.to_bytes(),b'\x03\x01t')
 
+    def test_from_list_packed(self):
+        writer = DollarListWriter()
+        for values in ([1, -300, 0], [0.5, -1.25, 1e300, float('inf')], [10**700, 1]):
+            dollar_list = DollarList.from_list(values)
+            self.assertEqual(dollar_list.items,
+                             [writer.create_dollar_item(value) for value in values])
+            self.assertEqual(dollar_list.to_bytes(), dumps(values))
+            self.assertEqual(dollar_list.to_list(), values)
+
 class TestDollarListFromString(unittest.TestCase):
 
     def test_empty(self):
@@ -268,6 +304,31 @@ class TestDollarListFromString(unittest.TestCase):
         dollar_list = DollarList.from_string('$lb(-3)')
         self.assertEqual(dollar_list.to_bytes(),b'\x03\x05\xfd')
 
+    def test_quoted_string(self):
+        dollar_list = DollarList.from_string('$lb("a,b)","say ""hi""","")')
+        self.assertEqual(dollar_list.to_list(),['a,b)','say "hi"',None])
+
+    def test_numbers(self):
+        dollar_list = DollarList.from_string('$lb(-3,1.5,-.5,1e+22,10)')
+        self.assertEqual(dollar_list.to_list(),[-3,1.5,-0.5,1e+22,10])
+
+    def test_nested_lists(self):
+        dollar_list = DollarList.from_string('$lb($lb($lb("a")),$lb(1,2),"b")')
+        self.assertEqual(dollar_list.to_list(),[[['a']],[1,2],'b'])
+
+    def test_empty_items(self):
+        self.assertEqual(DollarList.from_string('$lb()').to_bytes(),b'\x02\x01')
+        self.assertEqual(DollarList.from_string('$lb(1,,2)').to_list(),[1,None,2])
+
+    def test_round_trip(self):
+        dollar_list = DollarList.from_list(['a"b',-3,[1.5,['"']],None,'é中'])
+        self.assertEqual(DollarList.from_string(str(dollar_list)),dollar_list)
+
+    def test_invalid(self):
+        for string in ('lb(1)','$lb(1','$lb("a)','$lb(1)x','$lb(abc)','$lb(1)),'):
+            with self.assertRaises(DollarListException, msg=string):
+                DollarList.from_string(string)
+
 class TestDollarListDunder(unittest.TestCase):
 
     def test_eq_one_item(self):
@@ -316,6 +377,61 @@ class TestDollarListDunder(unittest.TestCase):
         self.assertTrue('t' in dollar_list)
         self.assertFalse(4 in dollar_list)
 
+    def test_contains_embedded_list(self):
+        dollar_list = DollarList.from_bytes(b'\x06\x01test\x05\x01\x03\x04\x04')
+        self.assertTrue(DollarList.from_list([4]) in dollar_list)
+        self.assertFalse(DollarList.from_list([5]) in dollar_list)
+        self.assertFalse({} in dollar_list)
+
+    def test_index_count(self):
+        dollar_list = DollarList.from_list(['t',3,'t'])
+        self.assertEqual(dollar_list.index('t'),0)
+        self.assertEqual(dollar_list.index('t',1),2)
+        self.assertEqual(dollar_list.count('t'),2)
+        self.assertEqual(dollar_list.count(4),0)
+        with self.assertRaises(ValueError):
+            dollar_list.index(4)
+
+    def test_hash(self):
+        dollar_list1 = DollarList.from_string('$lb("t",3)')
+        dollar_list2 = DollarList.from_bytes(b'\x03\x01t\x03\x04\x03')
+        self.assertEqual(hash(dollar_list1),hash(dollar_list2))
+        self.assertEqual(len({dollar_list1,dollar_list2}),1)
+        self.assertEqual({dollar_list1:1}[dollar_list2],1)
+
+    def test_eq_wide_headers(self):
+        # headers wider than needed are written again like the writer does
+        dollar_list = DollarList.from_bytes(b'\x00\x03\x00\x01ab')
+        self.assertEqual(dollar_list.to_bytes(),b'\x04\x01ab')
+        self.assertEqual(dollar_list,DollarList.from_list(['ab']))
+        self.assertEqual(hash(dollar_list),hash(DollarList.from_list(['ab'])))
+        self.assertTrue('ab' in dollar_list)
+        self.assertEqual(dollar_list.index('ab'),0)
+        self.assertEqual(dollar_list.count('ab'),1)
+        # a nested list with a wide header, holding an item with a wide header
+        dollar_list = DollarList.from_bytes(
+            b'\x03\x04\x01\x00\x0b\x00\x01\x00\x00\x00\x03\x00\x00\x00\x01ab')
+        self.assertEqual(dollar_list,DollarList.from_list([1,['ab']]))
+        self.assertEqual(dollar_list.to_bytes(),DollarList.from_list([1,['ab']]).to_bytes())
+        self.assertEqual(dollar_list[1].buffer,b'\x06\x01\x04\x01ab')
+        self.assertEqual(dollar_list[1].value.to_bytes(),b'\x04\x01ab')
+        self.assertTrue(DollarList.from_list(['ab']) in dollar_list)
+
+    def test_eq_after_change(self):
+        dollar_list1 = DollarList.from_string('$lb("t",3)')
+        dollar_list2 = DollarList.from_string('$lb("t",3)')
+        self.assertEqual(dollar_list1,dollar_list2)
+        dollar_list1.append(4)
+        self.assertNotEqual(dollar_list1,dollar_list2)
+        del dollar_list1[2]
+        self.assertEqual(dollar_list1,dollar_list2)
+        dollar_list1[0] = 'u'
+        self.assertNotEqual(dollar_list1,dollar_list2)
+        self.assertEqual(dollar_list1.to_bytes(),b'\x03\x01u\x03\x04\x03')
+
+    def test_eq_other_type(self):
+        self.assertFalse(DollarList.from_list(['t']) == ['t'])
+
     def test_str(self):
         dollar_list = DollarList.from_string('$lb("t",3)')
         self.assertEqual(str(dollar_list),'$lb("t",3)')
@@ -325,6 +441,58 @@ class TestDollarListDunder(unittest.TestCase):
         self.assertEqual(repr(dollar_list),'$lb("t",3)')
 
 
+class TestDollarListToString(unittest.TestCase):
+
+    def test_escaped_quotes(self):
+        dollar_list = DollarList.from_list(['say "hi"',['"']])
+        self.assertEqual(str(dollar_list),'$lb("say ""hi""",$lb(""""))')
+
+    def test_control_characters(self):
+        values = ['a\nb', '\r\n', '"\x00"\x7f', 'é\t中']
+        dollar_list = DollarList.from_list(values)
+        self.assertEqual(str(dollar_list),
+                         '$lb("a"_$c(10)_"b",$c(13,10),""""_$c(0)_""""_$c(127),"é"_$c(9)_"中")')
+        self.assertEqual(DollarList.from_string(str(dollar_list)).to_list(),values)
+
+    def test_binary_values(self):
+        # ascii values that are not text are written as latin-1
+        data = b'\x05\x01a"\xff\x05\x01b\x00\xe9'
+        dollar_list = DollarList.from_bytes(data)
+        self.assertEqual(dollar_list.to_list(),[b'a"\xff',b'b\x00\xe9'])
+        self.assertEqual(str(dollar_list),'$lb("a""\xff","b"_$c(0)_"\xe9")')
+        self.assertEqual(DollarList.from_string(str(dollar_list)).to_bytes(),data)
+
+    def test_unicode_value_not_str(self):
+        item = DollarItem(dollar_type=2, value=b'say "hi"', raw_value=b'', buffer=b'\x02\x02')
+        dollar_list = DollarList()
+        dollar_list.append(item)
+        self.assertEqual(str(dollar_list),'$lb("say ""hi""")')
+        item.value = 12
+        self.assertEqual(str(dollar_list),'$lb("12")')
+
+    def test_invalid_character_code(self):
+        with self.assertRaises(DollarListException):
+            DollarList.from_string('$lb($c(x))')
+        with self.assertRaises(DollarListException):
+            DollarList.from_string('$lb("a"_$c(10)')
+        with self.assertRaises(DollarListException):
+            DollarList.from_string('$lb("a"_1)')
+
+    def test_max_length(self):
+        dollar_list = DollarList.from_list(list(range(10)))
+        self.assertEqual(dollar_list.to_string(),str(dollar_list))
+        self.assertEqual(dollar_list.to_string(8),'$lb(0,1,...')
+        self.assertEqual(dollar_list.to_string(100),str(dollar_list))
+
+    def test_write_string(self):
+        dollar_list = DollarList.from_list([list(range(10000)),'a'])
+        file = io.StringIO()
+        self.assertEqual(dollar_list.write_string(file),len(str(dollar_list)))
+        self.assertEqual(file.getvalue(),str(dollar_list))
+        file = io.StringIO()
+        self.assertEqual(dollar_list.write_string(file,20000),20003)
+        self.assertEqual(file.getvalue(),str(dollar_list)[:20000]+'...')
+
 class TestDollarListFromBytes(unittest.TestCase):
 
     def test_empty(self):
@@ -369,6 +537,26 @@ class TestDollarListFromBytesError(unittest.TestCase):
         with self.assertRaises(ValueError):
             DollarList.from_bytes(data)
 
+    def test_type_zero(self):
+        # 0 only marks the decoded sub-lists, it is not a type of the wire
+        data = b'\x03\x00t'
+        with self.assertRaisesRegex(ValueError,'Invalid type'):
+            DollarList.from_bytes(data)
+        with self.assertRaisesRegex(ValueError,'Invalid type'):
+            DollarListReader(data).get_item_type(0)
+        # a value holding it is not a nested list
+        self.assertEqual(DollarList.from_bytes(b'\x05\x01' + data).to_list(),['\x03\x00t'])
+
+    def test_invalid_length(self):
+        # doubles of the wrong length and numbers without scale
+        for data in (b'\x06\x08\x00\x00\x00\x00', b'\x03\x09\x00', b'\x02\x06', b'\x02\x07'):
+            with self.assertRaisesRegex(ValueError,'Invalid length'):
+                DollarList.from_bytes(data)
+        with self.assertRaisesRegex(ValueError,'Invalid length'):
+            DollarListReader.get_double(b'\x00')
+        with self.assertRaisesRegex(ValueError,'Invalid length'):
+            DollarListReader.get_posnum(b'')
+
 class TestDollarListFloat(unittest.TestCase):
 
     def test_float_from_bytes(self):
@@ -391,6 +579,192 @@ class TestDollarListFloat(unittest.TestCase):
         reader = DollarList.from_list(data)
         self.assertEqual(reader.to_bytes(),b'\x05\x07\xFE\xC6\xFE')
 
+    def test_exponent_to_bytes(self):
+        # the mantissa and the scale come from repr()
+        self.assertEqual(DollarList.from_list([1e+22]).to_bytes(),b'\x04\x06\x16\x01')
+        self.assertEqual(DollarList.from_list([3.3e-30]).to_bytes(),b'\x04\x06\xe1\x21')
+        self.assertEqual(DollarList.from_list([-2.5e-7]).to_list(),[-2.5e-7])
+
+    def test_float_not_rounded(self):
+        value = 0.1 + 0.2
+        self.assertEqual(DollarList.from_list([value]).to_bytes(),
+                         b'\x0a\x06\xef\x04\x00\x43\x4f\xd7\x94\x6a')
+        self.assertEqual(DollarList.from_list([value]).to_list(),[value])
+
+    def test_float_as_double(self):
+        # no decimal form with a scale of one byte
+        for value in (5e-324, -1.5e300, float('inf'), float('-inf')):
+            buffer = DollarList.from_list([value]).to_bytes()
+            self.assertEqual(buffer[:2],b'\x0a\x08')
+            self.assertEqual(DollarList.from_bytes(buffer).to_list(),[value])
+        buffer = DollarList.from_list([float('nan')]).to_bytes()
+        self.assertEqual(buffer[:2],b'\x0a\x08')
+        self.assertTrue(math.isnan(DollarList.from_bytes(buffer).to_list()[0]))
+
+class TestDollarListDeep(unittest.TestCase):
+
+    def setUp(self):
+        dollar_list = DollarList.from_list([1])
+        for _ in range(2000):
+            dollar_list = DollarList.from_list([dollar_list,'t'])
+        self.data = dollar_list.to_bytes()
+
+    def test_from_bytes(self):
+        dollar_list = DollarList.from_bytes(self.data)
+        self.assertEqual(dollar_list.to_bytes(),self.data)
+        self.assertEqual(dollar_list[1].value,'t')
+
+    def test_str(self):
+        value = str(DollarList.from_bytes(self.data))
+        self.assertTrue(value.startswith('$lb($lb($lb('))
+        self.assertIn('$lb($lb(1),"t"),"t")',value)
+        self.assertEqual(value.count('$lb('),2001)
+
+    def test_incremental(self):
+        dollar_list = DollarList.from_bytes(self.data)
+        leaf = dollar_list
+        while leaf[0].dollar_type == 0:
+            leaf = leaf[0].value
+        leaf[0] = 2
+        self.assertEqual(len(dollar_list.to_bytes()),len(self.data))
+        self.assertEqual(dollar_list.to_bytes().replace(b'\x03\x04\x02',b'\x03\x04\x01'),self.data)
+
+    def test_to_list(self):
+        value = DollarList.from_bytes(self.data).to_list()
+        for _ in range(2000):
+            self.assertEqual(value[1],'t')
+            value = value[0]
+        self.assertEqual(value,[1])
+
+    def test_dumps_loads(self):
+        # nested python lists and tuples are encoded without recursion
+        value = [1]
+        for _ in range(2000):
+            value = [value,'t']
+        self.assertEqual(dumps(value),self.data)
+        self.assertEqual(dumps(loads(self.data)),self.data)
+        value = (1,)
+        for _ in range(2000):
+            value = (value,'t')
+        self.assertEqual(DollarList.from_list([value]).to_bytes(),
+                         DollarList.from_list([loads(self.data)]).to_bytes())
+        self.assertEqual(dumps([[]] * 3),b'\x04\x01\x02\x01' * 3)
+
+    def test_max_depth(self):
+        DollarList.from_bytes(self.data, max_depth=2001)
+        with self.assertRaises(DollarListException):
+            DollarList.from_bytes(self.data, max_depth=2000)
+
+    def test_same_as_reader(self):
+        data = b'\x06\x01test\x05\x01\x03\x04\x04\x04\x01\x02\x01\x03\x01\x03'
+        def fields(items):
+            return [(item.dollar_type,item.raw_value,item.buffer,item.offset,
+                     item.meta_value_length,item.meta_offset,str(item.value))
+                    for item in items]
+        self.assertEqual(fields(DollarList.from_bytes(data).items),
+                         fields(DollarListReader(data).items))
+
+class TestDollarListStats(unittest.TestCase):
+
+    def tearDown(self):
+        disable_stats()
+
+    def test_disabled(self):
+        self.assertIsNone(get_stats())
+
+    def test_decode(self):
+        stats = enable_stats()
+        DollarList.from_bytes(b'\x06\x01test\x05\x01\x03\x04\x04'
+                              + b'\x00\x00\x01\x01' + b'\x41'*255)
+        self.assertEqual(stats.items_decoded,{1:2,0:1,4:1})
+        self.assertEqual(stats.header_widths,{2:3,4:1,8:0})
+        self.assertEqual(stats.sublist_attempts,3)
+        self.assertEqual(stats.sublist_failures,2)
+        self.assertEqual(stats.bytes_decoded,270)
+        self.assertEqual(stats.phase_calls['decode'],1)
+
+    def test_encode(self):
+        stats = enable_stats()
+        DollarList.from_list(['t',3,-2])
+        self.assertEqual(stats.items_encoded,{1:1,4:1,5:1})
+        self.assertEqual(stats.bytes_encoded,9)
+        self.assertEqual(stats.phase_calls['encode'],3)
+
+    def test_parse_callback(self):
+        calls = []
+        enable_stats(lambda phase,elapsed,nbytes: calls.append((phase,nbytes)))
+        DollarList.from_string('$lb("test",$lb(4))')
+        self.assertEqual([call for call in calls if call[0] == 'parse'],[('parse',18)])
+        self.assertIn(('encode',6),calls)
+
+    def test_disable(self):
+        stats = enable_stats()
+        self.assertIs(disable_stats(),stats)
+        DollarList.from_bytes(b'\x03\x01t')
+        self.assertEqual(stats.items_decoded,{})
+
+class TestDollarListIncremental(unittest.TestCase):
+
+    def test_nested_append(self):
+        inner = DollarList.from_list(['a'])
+        outer = DollarList.from_list(['t',inner])
+        self.assertEqual(outer.to_bytes(),b'\x03\x01t\x05\x01\x03\x01a')
+        inner.append(4)
+        self.assertEqual(outer.to_bytes(),b'\x03\x01t\x08\x01\x03\x01a\x03\x04\x04')
+        self.assertEqual(outer[1].buffer,b'\x08\x01\x03\x01a\x03\x04\x04')
+
+    def test_nested_from_bytes(self):
+        outer = DollarList.from_bytes(b'\x03\x01t\x07\x01\x05\x01\x03\x01a')
+        outer[1].value[0].value[0] = 'b'
+        self.assertEqual(outer.to_bytes(),b'\x03\x01t\x07\x01\x05\x01\x03\x01b')
+        self.assertEqual(str(outer),'$lb("t",$lb($lb("b")))')
+
+    def test_siblings_reused(self):
+        outer = DollarList.from_list([['a'],['b'],['c']])
+        first = outer[0]
+        last = outer[2]
+        outer[1].value.append('d')
+        self.assertEqual(outer.to_list(),[['a'],['b','d'],['c']])
+        self.assertIs(outer[0],first)
+        self.assertIs(outer[2],last)
+        self.assertIsNot(outer[1].buffer,first.buffer)
+
+    def test_shared_sublist(self):
+        inner = DollarList.from_list(['a'])
+        first = DollarList.from_list([inner])
+        second = DollarList.from_list([inner,inner])
+        self.assertEqual(first.to_bytes(),b'\x05\x01\x03\x01a')
+        del inner[0]
+        inner.append('b')
+        self.assertEqual(first.to_bytes(),b'\x05\x01\x03\x01b')
+        self.assertEqual(second.to_bytes(),b'\x05\x01\x03\x01b'*2)
+        self.assertIn(['b'],second)
+
+    def test_invalidate(self):
+        outer = DollarList.from_bytes(b'\x05\x01\x03\x01a')
+        inner = outer[0].value
+        item = inner[0]
+        item.buffer = b'\x03\x01b'
+        self.assertEqual(outer.to_bytes(),b'\x05\x01\x03\x01a')
+        inner.invalidate()
+        self.assertEqual(outer.to_bytes(),b'\x05\x01\x03\x01b')
+
+    def test_items_changed_in_place(self):
+        outer = DollarList.from_bytes(b'\x05\x01\x03\x01a')
+        inner = outer[0].value
+        inner.items.append(DollarList.from_list([2]).items[0])
+        self.assertEqual(outer.to_bytes(),b'\x08\x01\x03\x01a\x03\x04\x02')
+        inner.items.reverse()
+        self.assertEqual(outer.to_bytes(),b'\x08\x01\x03\x04\x02\x03\x01a')
+        del inner.items[0]
+        self.assertEqual(outer.to_list(),[['a']])
+        inner.items = DollarList.from_list(['b','c']).items
+        self.assertEqual(outer.to_list(),[['b','c']])
+        # a nested list added to the items is tracked too
+        outer.items.extend(DollarList.from_list([['d']]).items)
+        outer[1].value.append('e')
+        self.assertEqual(outer.to_bytes(),DollarList.from_list([['b','c'],['d','e']]).to_bytes())
+
 if __name__ == '__main__':
     # init the data
     unittest.main()
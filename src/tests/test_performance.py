@@ -0,0 +1,95 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+# Throughput gates of the hot paths
+# The floors are about ten times lower than the throughput measured when
+# they were set, so that a slow machine passes and a regression fails.
+# The fast paths are also compared with the reference reader and writer,
+# which run in the same conditions.
+# DOLLAR_LIST_PERF_SLACK divides the floors and multiplies the ratios,
+# 0 skips the gates.
+
+import os
+import timeit
+import unittest
+
+from iris_dollar_list import DollarList, decode_table, dumps, loads
+from iris_dollar_list.dollar_list import DollarListReader, DollarListWriter
+
+SLACK = float(os.environ.get('DOLLAR_LIST_PERF_SLACK', '1'))
+
+# records per second
+MIN_DECODE_RATE = 4000
+MIN_ENCODE_RATE = 4000
+
+RECORDS = [[f'name{i}', i, i * 1.5, None, 'é中', [i, 'x']] for i in range(2000)]
+BUFFERS = [dumps(record) for record in RECORDS]
+
+def best_time(function):
+    # the best of a few runs is the least noisy measure
+    return min(timeit.repeat(function, number=1, repeat=5))
+
+@unittest.skipIf(SLACK == 0, 'DOLLAR_LIST_PERF_SLACK is 0')
+class TestPerformance(unittest.TestCase):
+
+    def assert_rate(self, function, floor):
+        rate = len(RECORDS) / best_time(function)
+        self.assertGreater(rate, floor / SLACK, f'{rate:.0f} records/s')
+
+    def assert_faster(self, function, reference, ratio=1.0):
+        time = best_time(function)
+        reference_time = best_time(reference)
+        self.assertLess(time, reference_time * ratio * SLACK,
+                        f'{time:.4f} s against {reference_time:.4f} s')
+
+    def test_decode(self):
+        self.assert_rate(lambda: [loads(buffer) for buffer in BUFFERS], MIN_DECODE_RATE)
+        self.assert_rate(lambda: [DollarList.from_bytes(buffer) for buffer in BUFFERS],
+                        MIN_DECODE_RATE)
+
+    def test_encode(self):
+        self.assert_rate(lambda: [dumps(record) for record in RECORDS], MIN_ENCODE_RATE)
+
+    def test_decode_items_against_reader(self):
+        # without recursion, it must not be slower than the recursive reader
+        self.assert_faster(lambda: [DollarList.from_bytes(buffer) for buffer in BUFFERS],
+                          lambda: [DollarListReader(buffer) for buffer in BUFFERS], 1.5)
+
+    def test_decode_table_against_from_bytes(self):
+        self.assert_faster(lambda: decode_table(BUFFERS),
+                          lambda: [DollarList.from_bytes(buffer).to_list() for buffer in BUFFERS])
+
+    def test_dumps_against_append(self):
+        def append():
+            for record in RECORDS:
+                dollar_list = DollarList()
+                for value in record:
+                    dollar_list.append(value)
+                dollar_list.to_bytes()
+        self.assert_faster(lambda: [dumps(record) for record in RECORDS], append, 1.5)
+
+    def test_packed_numbers(self):
+        # a list of int or of float is packed in one loop, by dumps and from_list,
+        # instead of one item per value
+        writer = DollarListWriter()
+        ints = list(range(-10000, 10000))
+        floats = [value * 0.37 for value in ints]
+        for values in (ints, floats):
+            self.assert_faster(lambda values=values: dumps(values),
+                              lambda values=values: b''.join(
+                                  [writer.create_dollar_item(value).buffer for value in values]),
+                              0.5)
+            self.assert_faster(lambda values=values: DollarList.from_list(values),
+                              lambda values=values: [writer.create_dollar_item(value)
+                                                     for value in values])
+
+    def test_to_bytes_memoized(self):
+        dollar_lists = [DollarList.from_list(record) for record in RECORDS]
+        for dollar_list in dollar_lists:
+            dollar_list.to_bytes()
+        self.assert_faster(lambda: [dollar_list.to_bytes() for dollar_list in dollar_lists],
+                          lambda: [b''.join([item.buffer for item in dollar_list.items])
+                                   for dollar_list in dollar_lists])
+
+if __name__ == '__main__':
+    unittest.main()
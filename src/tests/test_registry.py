@@ -0,0 +1,110 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import datetime
+import decimal
+import struct
+import unittest
+
+from iris_dollar_list import (DollarList, DollarListException, Dollartype,
+                              register_decoder, register_encoder, register_horolog,
+                              unregister_encoder, horolog_to_date, horolog_to_datetime,
+                              dumps, loads)
+from iris_dollar_list import dollar_list as module
+
+class Patient: # pylint: disable=too-few-public-methods
+
+    def __init__(self, name, age):
+        self.name = name
+        self.age = age
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.decoders = dict(module.SCALAR_DECODERS)
+
+    def tearDown(self):
+        module.SCALAR_DECODERS.clear()
+        module.SCALAR_DECODERS.update(self.decoders)
+
+    def test_bytes(self):
+        dollar_list = DollarList.from_list([b'\xff\x00',b''])
+        self.assertEqual(dollar_list.to_bytes(),b'\x04\x01\xff\x00\x02\x01')
+        self.assertEqual(DollarList.from_bytes(dollar_list.to_bytes()).to_list(),[b'\xff\x00',None])
+
+    def test_bool(self):
+        dollar_list = DollarList.from_list([True,False])
+        self.assertEqual(dollar_list.to_bytes(),b'\x03\x04\x01\x02\x04')
+
+    def test_decimal(self):
+        dollar_list = DollarList.from_list([decimal.Decimal('3.14'),decimal.Decimal('-3.14')])
+        self.assertEqual(dollar_list.to_bytes(),b'\x05\x06\xfe\x3a\x01\x05\x07\xFE\xC6\xFE')
+        with self.assertRaises(DollarListException):
+            DollarList.from_list([decimal.Decimal('NaN')])
+
+    def test_negative_int(self):
+        for value in (-1,-128,-129,-200,-40000,-2**40):
+            data = DollarList.from_list([value]).to_bytes()
+            self.assertEqual(DollarList.from_bytes(data).to_list(),[value])
+        self.assertEqual(DollarList.from_list([-128]).to_bytes(),b'\x03\x05\x80')
+
+    def register_encoder(self, python_type, encoder):
+        register_encoder(python_type, encoder)
+        self.addCleanup(unregister_encoder, python_type)
+
+    def test_register_encoder(self):
+        self.register_encoder(Patient,
+                              lambda patient: DollarList.from_list([patient.name,patient.age]))
+        dollar_list = DollarList.from_list([Patient('Smith',42)])
+        self.assertEqual(dollar_list.to_list(),[['Smith',42]])
+
+    def test_register_encoder_subclass(self):
+        class Child(Patient): # pylint: disable=too-few-public-methods
+            pass
+        self.register_encoder(Patient, lambda patient: patient.name)
+        self.assertEqual(DollarList.from_list([Child('Doe',1)]).to_list(),['Doe'])
+
+    def test_register_encoder_override(self):
+        self.register_encoder(float, lambda value: DollarList.from_list([int(value)]))
+        self.assertEqual(DollarList.from_list([1.5]).to_list(),[[1]])
+        # not packed as floats
+        self.assertEqual(loads(dumps([1.5,2.5])),[[1],[2]])
+
+    def test_unregister_encoder(self):
+        self.register_encoder(Patient, lambda patient: patient.name)
+        self.register_encoder(float, int)
+        self.assertEqual(DollarList.from_list([Patient('Doe',1),1.5]).to_list(),['Doe',1])
+        unregister_encoder(Patient)
+        unregister_encoder(float)
+        with self.assertRaises(DollarListException):
+            DollarList.from_list([Patient('Doe',1)])
+        self.assertEqual(DollarList.from_list([1.5]).to_list(),[1.5])
+        # not registered
+        unregister_encoder(complex)
+
+    def test_invalid_type(self):
+        with self.assertRaises(DollarListException):
+            DollarList.from_list([Patient('Smith',42)])
+
+    def test_register_decoder(self):
+        register_decoder(Dollartype.ITEM_DOUBLE, lambda raw_value: decimal.Decimal(
+            struct.unpack('<d',raw_value)[0]))
+        value = DollarList.from_bytes(b'\x0a\x08' + struct.pack('<d',0.5)).to_list()
+        self.assertEqual(value,[decimal.Decimal('0.5')])
+
+    def test_register_decoder_ascii(self):
+        with self.assertRaises(DollarListException):
+            register_decoder(Dollartype.ITEM_ASCII, bytes)
+
+    def test_horolog(self):
+        register_horolog()
+        self.addCleanup(unregister_encoder, datetime.date)
+        self.addCleanup(unregister_encoder, datetime.datetime)
+        dollar_list = DollarList.from_list([datetime.date(2022,11,14),
+                                            datetime.datetime(2022,11,14,10,30,5)])
+        self.assertEqual(dollar_list.to_list(),[66427,'66427,37805'])
+        self.assertEqual(horolog_to_date(66427),datetime.date(2022,11,14))
+        self.assertEqual(horolog_to_datetime('66427,37805'),datetime.datetime(2022,11,14,10,30,5))
+
+if __name__ == '__main__':
+    unittest.main()
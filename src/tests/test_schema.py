@@ -0,0 +1,89 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import unittest
+
+from iris_dollar_list import DollarList, DollarListException, DollarSchema, Dollartype
+
+PATIENT = DollarSchema([
+    ('name','ascii'),
+    ('count','int'),
+    ('scores',['double']),
+], name='Patient', output='namedtuple')
+
+class TestDollarSchema(unittest.TestCase):
+
+    def test_encode_same_as_writer(self):
+        schema = DollarSchema(['ascii','int','int','str','num'])
+        record = ('test',4,-2,'Զ',3.14)
+        self.assertEqual(schema.encode(record),
+                         DollarList.from_list(list(record)).to_bytes())
+
+    def test_round_trip(self):
+        record = PATIENT.decode(PATIENT.encode(('Smith',3,[1.5,2.0])))
+        self.assertEqual(record.name,'Smith')
+        self.assertEqual(record.count,3)
+        self.assertEqual(record.scores,[1.5,2.0])
+
+    def test_decode_nested_schema(self):
+        schema = DollarSchema([('name','ascii'),('child',DollarSchema(['int']))])
+        data = b'\x06\x01test\x05\x01\x03\x04\x04'
+        self.assertEqual(schema.decode(data),('test',(4,)))
+
+    def test_string_that_looks_like_a_list(self):
+        schema = DollarSchema(['bytes'])
+        data = schema.encode([b'\x03\x04\x04'])
+        self.assertEqual(schema.decode(data),(b'\x03\x04\x04',))
+
+    def test_nulls(self):
+        data = PATIENT.encode({'name':'Smith'})
+        self.assertEqual(PATIENT.decode(data),('Smith',None,None))
+        self.assertEqual(PATIENT.decode(b'\x07\x01Smith'),('Smith',None,None))
+
+    def test_dollartype_field(self):
+        schema = DollarSchema([Dollartype.ITEM_POSINT])
+        self.assertEqual(schema.decode(b'\x03\x04\x01'),(1,))
+
+    def test_dataclass(self):
+        schema = DollarSchema([('name','ascii')], output='dataclass')
+        record = schema.decode(b'\x03\x01t')
+        self.assertEqual(record.name,'t')
+        self.assertEqual(schema.encode(record),b'\x03\x01t')
+
+    def test_invalid_value(self):
+        with self.assertRaises(DollarListException):
+            PATIENT.encode(('Smith','3',[]))
+
+    def test_invalid_item_type(self):
+        with self.assertRaises(DollarListException):
+            PATIENT.decode(b'\x03\x01t\x03\x01t')
+
+    def test_too_many_items(self):
+        with self.assertRaises(DollarListException):
+            DollarSchema(['ascii']).decode(b'\x03\x01t\x03\x01t')
+
+    def test_num_int(self):
+        schema = DollarSchema(['num','num'])
+        self.assertEqual(schema.decode(b'\x03\x04\x03\x03\x05\xfd'),(3,-3))
+        self.assertEqual(schema.encode((2**60 + 1,1.5)),
+                         DollarList.from_list([2**60 + 1,1.5]).to_bytes())
+        self.assertEqual(schema.decode(schema.encode((2**60 + 1,None))),(2**60 + 1,None))
+
+    def test_invalid_encoded_value(self):
+        with self.assertRaises(DollarListException):
+            DollarSchema(['ascii']).encode(('é',))
+
+    def test_invalid_decoded_value(self):
+        with self.assertRaises(DollarListException):
+            DollarSchema(['ascii']).decode(b'\x03\x01\xe9')
+        with self.assertRaises(DollarListException):
+            DollarSchema(['double']).decode(b'\x06\x08\x00\x00\x00\x00')
+        with self.assertRaises(DollarListException):
+            PATIENT.decode(b'\x03\x01t\x02\x04\x08\x01\x06\x08\x00\x00\x00\x00')
+
+    def test_invalid_field_type(self):
+        with self.assertRaises(DollarListException):
+            DollarSchema(['varchar'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import math
+import unittest
+
+from iris_dollar_list import DollarList, DollarListException, decode_table
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+ROWS = [
+    DollarList.from_list(['Smith', 3, 1.5]).to_bytes(),
+    DollarList.from_list(['Doe', -4]).to_bytes(),
+    DollarList.from_list(['Roe', 5, 2.5, 'extra']).to_bytes(),
+]
+
+class TestDecodeTable(unittest.TestCase):
+
+    def test_no_schema(self):
+        table = decode_table(ROWS)
+        self.assertEqual(len(table),3)
+        self.assertEqual(table.names,[0,1,2,3])
+        self.assertEqual(table[0],['Smith','Doe','Roe'])
+        self.assertEqual(table[2],[1.5,None,2.5])
+        self.assertEqual(table[3],[None,None,'extra'])
+
+    def test_same_as_to_list(self):
+        rows = [b'\x06\x01test\x05\x01\x03\x04\x04', b'\x02\x01\x03\x01t']
+        table = decode_table(rows)
+        for i,row in enumerate(rows):
+            self.assertEqual([column[i] for column in table.columns],
+                             DollarList.from_bytes(row).to_list())
+
+    def test_schema(self):
+        table = decode_table(ROWS, [('name',None),('count','q'),('score','d')])
+        self.assertEqual(table.names,['name','count','score'])
+        self.assertEqual(list(table['count']),[3,-4,5])
+        self.assertEqual(table['score'][0],1.5)
+        self.assertTrue(math.isnan(table['score'][1]))
+        self.assertEqual(list(table.nulls[2]),[0,1,0])
+
+    def test_to_dict_int_nulls(self):
+        rows = [DollarList.from_list([1]).to_bytes(), b'\x02\x01']
+        table = decode_table(rows, {'a':'q','b':'q'})
+        columns = table.to_dict()
+        self.assertEqual(columns['a'],[1,None])
+        self.assertEqual(columns['b'],[None,None])
+
+    def test_to_dict_mixed(self):
+        table = decode_table(ROWS, [('name',None),('score','d')])
+        columns = table.to_dict()
+        self.assertEqual(columns['name'],['Smith','Doe','Roe'])
+        self.assertEqual(columns['score'].typecode,'d')
+
+    def test_deep_nested_value(self):
+        # deeper than the recursion limit
+        value = b'\x03\x04\x01'
+        for _ in range(2000):
+            value = b'\x00' + (len(value) + 1).to_bytes(2, 'little') + b'\x01' + value
+        table = decode_table([b'\x03\x04\x02' + value])
+        column = table[1][0]
+        for _ in range(1999):
+            column, = column
+        self.assertEqual(column,[1])
+
+    @unittest.skipIf(pandas is None, 'pandas is not installed')
+    def test_to_pandas(self):
+        table = decode_table(ROWS, [('name',None),('count','q'),('score','d')])
+        frame = table.to_pandas()
+        self.assertEqual(list(frame.columns),['name','count','score'])
+        self.assertEqual(list(frame['name']),['Smith','Doe','Roe'])
+        self.assertEqual(list(frame['count']),[3,-4,5])
+        self.assertTrue(math.isnan(frame['score'][1]))
+        frame = decode_table([DollarList.from_list([1]).to_bytes(), b'\x02\x01'],
+                             {'a':'q'}).to_pandas()
+        self.assertEqual(str(frame['a'].dtype),'Int64')
+        self.assertTrue(pandas.isna(frame['a'][1]))
+
+    def test_invalid_typecode(self):
+        with self.assertRaises(DollarListException):
+            decode_table(ROWS, [('name','u')])
+
+    def test_invalid_value(self):
+        with self.assertRaises(DollarListException):
+            decode_table(ROWS, [('name','q')])
+
+    def test_invalid_buffer(self):
+        with self.assertRaises(ValueError):
+            decode_table([b'\x03\x01'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+# Licensed under the MIT License
+# https://github.com/grongierisc/dollar-list/blob/main/LICENSE
+
+import unittest
+
+from iris_dollar_list import DollarList, validate
+
+class TestValidate(unittest.TestCase):
+
+    def test_valid(self):
+        result = validate(b'\x03\x01t\x03\x04\x03')
+        self.assertTrue(result)
+        self.assertEqual(result.items,2)
+        self.assertEqual(result.total_items,2)
+        self.assertEqual(result.max_depth,1)
+        self.assertIsNone(result.error_offset)
+
+    def test_embedded_list(self):
+        result = validate(b'\x06\x01test\x05\x01\x03\x04\x04')
+        self.assertTrue(result)
+        self.assertEqual(result.items,2)
+        self.assertEqual(result.total_items,3)
+        self.assertEqual(result.max_depth,2)
+
+    def test_not_recursive(self):
+        result = validate(b'\x06\x01test\x05\x01\x03\x04\x04', recursive=False)
+        self.assertEqual(result.total_items,2)
+        self.assertEqual(result.max_depth,1)
+
+    def test_deep(self):
+        dollar_list = DollarList.from_list([1])
+        for _ in range(50):
+            dollar_list = DollarList.from_list([dollar_list])
+        result = validate(dollar_list.to_bytes())
+        self.assertEqual(result.max_depth,51)
+        self.assertEqual(result.total_items,51)
+
+    def test_long_length(self):
+        self.assertTrue(validate(b'\x00\x00\x01\x01' + b'\x41'*255))
+        self.assertTrue(validate(b'\x00\x00\x00\x01\xf4\x01\x00\x01' + b'\x41'*256*500))
+
+    def test_truncated(self):
+        result = validate(b'\x03\x01t\x03\x01')
+        self.assertFalse(result)
+        self.assertEqual(result.error_offset,3)
+        self.assertEqual(result.items,0)
+
+    def test_truncated_long_length(self):
+        result = validate(b'\x00\x00\x01\x01' + b'\x41'*254)
+        self.assertEqual(result.error_offset,0)
+
+    def test_invalid_type(self):
+        result = validate(b'\x03\x01t\x02\x0a')
+        self.assertEqual(result.error_offset,3)
+        self.assertEqual(result.error,'Invalid type')
+
+    def test_invalid_double_length(self):
+        self.assertFalse(validate(b'\x05\x08abc'))
+
+    def test_same_as_from_bytes(self):
+        for data in (b'\x02', b'\x03\x01', b'\x00\x05\x00\x01ab', b'\x01\x01'):
+            self.assertFalse(validate(data))
+            with self.assertRaises(ValueError):
+                DollarList.from_bytes(data)
+
+if __name__ == '__main__':
+    unittest.main()